@@ -0,0 +1,20 @@
+'''
+_jcalc_ext
+Optional Cython extension for the scalar euler and rk4 solvers of jcalc
+
+Build it in the same folder as jcalc.py with:
+   cythonize -i _jcalc_ext.pyx
+jcalc uses it when it is found and the state is a float
+'''
+
+cpdef double eulerScalar(double x, double t, f, double h):
+    cdef double d = f(x,t)
+    return x + h*d
+
+cpdef double rk4Scalar(double x, double t, f, double h):
+    cdef double k1, k2, k3, k4
+    k1 = h * f(x,t)
+    k2 = h * f(x + k1/2.0 , t + h/2.0)
+    k3 = h * f(x + k2/2.0 , t + h/2.0)
+    k4 = h * f(x + k3     , t + h)
+    return x + ( k1/6 + k2/3 + k3/3 + k4/6 )
@@ -0,0 +1,37 @@
+'''
+build_jcalc_aot.py
+Builds the optional _jcalc_aot extension module with the Numba
+ahead of time compiler
+
+The extension contains the kernels of the jcalc array functions
+(normalizeLineV, divider2theveninV ...) already compiled so jcalc
+can use them without Numba installed and without JIT warmup
+
+Run it in the same folder as jcalc.py:
+   python build_jcalc_aot.py
+
+History:
+  15/10/2026 : First version
+'''
+
+from __future__ import print_function
+
+from numba.pycc import CC
+
+import jcalc
+
+cc = CC('_jcalc_aot')
+
+# Signatures for kernels with four and three arguments
+sig4 = 'void(f8[:],f8[:],f8[:],f8[:],f8[:],f8[:])'
+sig3 = 'void(f8[:],f8[:],f8[:],f8[:],f8[:])'
+
+cc.export('normalizeLineK',sig4)(jcalc._normalizeLineK.py_func)
+cc.export('divider2theveninK',sig4)(jcalc._divider2theveninK.py_func)
+cc.export('thevenin2dividerK',sig4)(jcalc._thevenin2dividerK.py_func)
+cc.export('niAmplifierK',sig3)(jcalc._niAmplifierK.py_func)
+cc.export('niAmplifierRK',sig3)(jcalc._niAmplifierRK.py_func)
+
+if __name__ == '__main__':
+    cc.compile()
+    print('_jcalc_aot built')
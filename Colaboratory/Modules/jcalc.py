@@ -17,13 +17,84 @@ History:
    5/03/2018 : Added Euler and Runge-Kutta solvers
    9/03/2018 : Added plotHist for histograms
   11/03/2018 : jcalc is now deprecated  
+  15/10/2026 : Numba compiled path for euler and rk4
+               Added rk4Integrate
+               rk4 calculates vector states in place on work buffers
+               Plot functions selected from a table
+               Batched curves in plot1n and plotnn
+               Added backgroundRender and flush
+               Added useFastBackend
+               x can be None in plot11 and plot1n
+               Single curve path in plot1n and plotnn
+               Cached default x sequences
+               Optional Cython extension for scalar euler and rk4
+               Grid and limits set on the axes object
+               Plot border drawn with the axes spines
+               Equal length plotnn curves drawn as 2D arrays
+               Added array versions of the geometric and DC functions
+               thevenin2divider without branches
+               Optional ahead of time compiled kernels
+               Added jitRhs
+               Legend built from the plotted lines with ax.legend
+               Added rk45 and integrateAdaptive
+               integrateAdaptive has hmin and maxSteps limits
+               Added useFigPool and resetPool
 '''
 
 from __future__ import print_function
 
 import numpy as np               # Import numpy for numeric calculations
-import pylab as pl               # Import pylab
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.axes import Axes
+
+import io
+import threading
+import warnings
+try:
+    import queue                 # Python 3
+except ImportError:
+    import Queue as queue        # Python 2.7
+
+# Numba is optional
+# If it is not available the pure Python code is used
+try:
+    import numba
+    try:
+        from numba.core.registry import CPUDispatcher
+    except ImportError:
+        from numba.targets.registry import CPUDispatcher
+    from numba import prange
+    numbaFound = True
+except ImportError:
+    numbaFound = False
+    prange = range
+
+# Decorators that compile with Numba when it is available
+if numbaFound:
+    _jit  = numba.njit(cache=True)
+    _pjit = numba.njit(parallel=True,cache=True)
+else:
+    def _jit(f):
+        return f
+    _pjit = _jit
+
+# Cython extension for scalar solvers is optional
+# Build it from _jcalc_ext.pyx
+try:
+    import _jcalc_ext
+    extFound = True
+except ImportError:
+    extFound = False
+
+# Ahead of time compiled kernels for the array functions are optional
+# Build them with build_jcalc_aot.py
+try:
+    import _jcalc_aot
+    aotFound = True
+except ImportError:
+    aotFound = False
 
 #########################################################################################
 # PRINTING CODE                                                                         #
@@ -57,6 +128,116 @@ def printTitle(title):
 # DRAWING CODE                                                                          #
 #########################################################################################
 
+# Background rendering ##################################################################
+
+# Background rendering not enabled by default
+bRender = False
+
+# Queue of figures pending to render and its worker thread
+_renderQueue  = queue.Queue()
+_renderThread = None
+
+'''
+_showPNG
+Renders a figure to PNG and displays it
+'''
+def _showPNG(fig):
+    # IPython is only needed to display images
+    from IPython.display import display, Image
+    buf = io.BytesIO()
+    fig.savefig(buf,format='png')
+    display(Image(buf.getvalue()))
+
+'''
+_renderWorker
+Renders to PNG and displays the figures sent to the render queue
+Runs in the background render thread
+'''
+def _renderWorker():
+    while True:
+        fig = _renderQueue.get()
+        try:
+            _showPNG(fig)
+        finally:
+            _renderQueue.task_done()
+
+'''
+@backgroundRender@
+backgroundRender(flag)
+Renders the plots in a background thread so the plot
+commands return without waiting for the drawing
+Figures are shown as PNG images
+Use flush() to wait for the pending plots
+
+Optional parameters:
+   flag : Set background rendering (defaults to True)
+
+Returns nothing
+'''
+def backgroundRender(flag=True):
+    global bRender,_renderThread
+    bRender = flag
+    if flag and _renderThread is None:
+        _renderThread = threading.Thread(target=_renderWorker)
+        _renderThread.daemon = True
+        _renderThread.start()
+
+'''
+@flush@
+flush()
+Waits until all plots sent to background rendering are shown
+
+Returns nothing
+'''
+def flush():
+    _renderQueue.join()
+
+'''
+@useFastBackend@
+useFastBackend()
+Selects the non interactive Agg backend
+Plots are rendered to PNG and displayed as images
+That is faster than the interactive backends
+
+Returns nothing
+'''
+def useFastBackend():
+    matplotlib.use('Agg',force=True)
+
+# Figure pool ###########################################################################
+
+# Figure pool not enabled by default
+figPool = False
+
+# Figures available for reuse
+_FIG_POOL = []
+
+'''
+@useFigPool@
+useFigPool(flag)
+Reuses the figures of previous plots instead of creating new ones
+Pooled figures are shown as PNG images
+Use resetPool() to release the pooled figures
+
+Optional parameters:
+   flag : Set figure reuse (defaults to True)
+
+Returns nothing
+'''
+def useFigPool(flag=True):
+    global figPool
+    figPool = flag
+
+'''
+@resetPool@
+resetPool()
+Releases all figures in the figure pool
+
+Returns nothing
+'''
+def resetPool():
+    del _FIG_POOL[:]
+
 # Internal functions ####################################################################
 
 '''
@@ -67,19 +248,25 @@ Paramenters:
   xt    : x label of the plot (defaults to none)
   yt    : y label of the plot (defaults to none)
   grid  : Determines if there is grid (defaults to True)
+  fig   : Figure to reuse (defaults to a pooled or new one)
 Returns:
   fig : Figure object
   ax  : Axes object  
 '''
-def _plotStart(title="",xt="",yt="",grid=True):
-    fig=plt.figure()
+def _plotStart(title="",xt="",yt="",grid=True,fig=None):
+    if fig is None and figPool and len(_FIG_POOL):
+        fig = _FIG_POOL.pop()
+    if fig is None:
+        fig = plt.figure()
+    else:
+        fig.clear()
     ax = fig.add_subplot(111)
     ax.set_facecolor("white")
     ax.set_title(title)
     ax.set_xlabel(xt)
     ax.set_ylabel(yt)
     if (grid):
-        plt.grid(True,color="lightgrey",linestyle='--')
+        ax.grid(True,color="lightgrey",linestyle='--')
     return fig,ax
 
 '''
@@ -90,37 +277,92 @@ Paramenters:
   ax       : Axes obtained from plotStart
   labels   : List of labels for the curves (defaults to none)
   location : Location for labels (defaults to 'best')
+  handles  : List of lines for the labels (defaults to none)
 Returns nothing  
 '''    
-def _plotEnd(fig,ax,labels=[],location='best'):
-    if not labels == []:
-        pl.legend(loc=location)
-    xmin, xmax = plt.xlim()
-    ymin, ymax = plt.ylim()
-    ax.axvline(x=xmin,linewidth=2, color='black')
-    ax.axvline(x=xmax,linewidth=2, color='black')
-    ax.axhline(y=ymin,linewidth=2, color='black')
-    ax.axhline(y=ymax,linewidth=2, color='black')
-    plt.show()
+def _plotEnd(fig,ax,labels=[],location='best',handles=None):
+    if len(labels):
+        if handles is None:
+            ax.legend(loc=location)
+        else:
+            ax.legend(handles,labels,loc=location)
+    # Black border using the axes spines
+    for side in ('top','bottom','left','right'):
+        ax.spines[side].set_linewidth(2)
+        ax.spines[side].set_color('black')
+    if bRender:
+        # Detach the figure from pyplot and render it in background
+        plt.close(fig)
+        _renderQueue.put(fig)
+    elif figPool:
+        # Show the figure and keep it for reuse
+        _showPNG(fig)
+        plt.close(fig)
+        _FIG_POOL.append(fig)
+    elif matplotlib.get_backend().lower() == 'agg':
+        _showPNG(fig)
+        plt.close(fig)
+    else:
+        plt.show()
+
+# Plot functions with (logx,logy) keys
+# They are Axes methods so they don't depend on the current pyplot figure
+_PLOT_FUNCS = { (False,False) : Axes.plot
+              , (True,False)  : Axes.semilogx
+              , (False,True)  : Axes.semilogy
+              , (True,True)   : Axes.loglog }
 
 '''
 _plotXY
 Plot two magnitudes using log if needed
 Used by the plot11, plot1n and plotnn commands
+Returns the list of plotted lines
 '''
-def _plotXY(x,y,label="",logx=False,logy=False):
-    if not logx and not logy:
-        pl.plot(x,y,label=label)
-        return
-    if logx and not logy:
-        pl.semilogx(x,y,label=label)
-        return
-    if logy and not logx:
-        pl.semilogy(x,y,label=label)
-        return
-    if logx and logy:
-        pl.loglog(x,y,label=label)
-        return
+def _plotXY(ax,x,y,label="",logx=False,logy=False):
+    return _PLOT_FUNCS[(logx,logy)](ax,x,y,label=label)
+
+# Cache of read only sequences for the x axis with length keys
+_seqCache = {}
+
+'''
+_seq
+Returns a read only sequence 0..n-1 for the x axis
+Sequences are cached so repeated plots of the same length
+don't allocate a new one
+'''
+def _seq(n):
+    try:
+        return _seqCache[n]
+    except KeyError:
+        if len(_seqCache) >= 32:
+            _seqCache.clear()
+        a = np.arange(0,n)
+        a.setflags(write=False)
+        _seqCache[n] = a
+        return a
+
+'''
+_sameLength
+Indicates if all vectors in a list have the same length
+Returns True for an empty list
+'''
+def _sameLength(vlist):
+    if len(vlist) == 0:
+        return True
+    n = len(vlist[0])
+    return all(len(v) == n for v in vlist)
+
+'''
+_plotCollection
+Plot several unlabeled curves in linear axes as only one LineCollection
+Colors follow the axes color cycle
+Used by the plotnn command
+'''
+def _plotCollection(ax,xlist,ylist):
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    segments = [np.column_stack((x,y)) for x,y in zip(xlist,ylist)]
+    ax.add_collection(LineCollection(segments,colors=colors))
+    ax.autoscale_view()
      
 # Public functions ######################################################################
      
@@ -128,7 +370,7 @@ def _plotXY(x,y,label="",logx=False,logy=False):
 @plot11@
 plot11(x,y,title,xt,yt,logx,logy)
 Plot one input against one output
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -148,12 +390,12 @@ Returns nothing
 def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True):
 
     # Generate sequence if x is not provided
-    if x == []:
-        x = np.arange(0,len(y))
+    if x is None or len(x) == 0:
+        x = _seq(len(y))
        
     fig,ax = _plotStart(title,xt,yt,grid)
 
-    _plotXY(x,y,logx=logx,logy=logy)
+    _plotXY(ax,x,y,logx=logx,logy=logy)
     
     _plotEnd(fig,ax)
     
@@ -161,7 +403,7 @@ def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True):
 @plot1n@
 plot1n(x,ylist,title,xt,yt,labels,location,logx,logy)
 Plot one input against several outputs
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -183,19 +425,24 @@ Returns nothing
 def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='best',logx=False,logy=False,grid=True):
 
     # Generate sequence is x is not provided
-    if x == []:
-        x = np.arange(0,len(ylist[0]))        
+    if x is None or len(x) == 0:
+        x = _seq(len(ylist[0]))        
         
     fig,ax=_plotStart(title,xt,yt,grid)
     
-    if labels == []:
-        for y in ylist:
-            _plotXY(x,y,logx=logx,logy=logy)
+    if len(ylist) == 1:
+        # Only one curve
+        lines = _plotXY(ax,x,ylist[0],logx=logx,logy=logy)
+    elif len(ylist) > 1 and not logx and not logy:
+        # All curves in only one call
+        lines = ax.plot(x,np.column_stack(ylist))
     else:
-        for y,lbl in zip(ylist,labels):
-            _plotXY(x,y,label=lbl,logx=logx,logy=logy)
+        plotFn = _PLOT_FUNCS[(logx,logy)]
+        lines = []
+        for y in ylist:
+            lines += plotFn(ax,x,y)
 
-    _plotEnd(fig,ax,labels,location)   
+    _plotEnd(fig,ax,labels,location,lines)   
   
 '''
 @plotnn@
@@ -222,14 +469,23 @@ def plotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='best',logx=False
 
     fig,ax=_plotStart(title,xt,yt,grid)
     
-    if labels == []:
-        for x,y in zip(xlist,ylist):
-            _plotXY(x,y,logx=logx,logy=logy)
+    plotFn = _PLOT_FUNCS[(logx,logy)]
+    if len(ylist) == 1:
+        # Only one curve
+        lines = plotFn(ax,xlist[0],ylist[0])
+    elif len(xlist) > 1 and _sameLength(xlist):
+        # Curves as columns of 2D arrays in only one call
+        lines = plotFn(ax,np.column_stack(xlist),np.column_stack(ylist))
+    elif len(labels) == 0 and not logx and not logy:
+        # Unlabeled curves in only one collection
+        _plotCollection(ax,xlist,ylist)
+        lines = []
     else:
-        for x,y,lbl in zip(xlist,ylist,labels):
-            _plotXY(x,y,label=lbl,logx=logx,logy=logy)
+        lines = []
+        for x,y in zip(xlist,ylist):
+            lines += plotFn(ax,x,y)
             
-    _plotEnd(fig,ax,labels,location)  
+    _plotEnd(fig,ax,labels,location,lines)  
     
 '''
 @plotHist@
@@ -252,7 +508,7 @@ def plotHist(v,bins=10,title="",xt="",yt="",grid=True):
 
     fig,ax = _plotStart(title,xt,yt,grid)
 
-    plt.hist(v,bins)
+    ax.hist(v,bins)
     
     _plotEnd(fig,ax)    
     
@@ -260,6 +516,199 @@ def plotHist(v,bins=10,title="",xt="",yt="",grid=True):
 # DIFFERENTIAL EQUATIONS CODE                                                           #
 #########################################################################################      
     
+# Internal functions ####################################################################
+
+'''
+_euler and _rk4
+Pure Python steps of the euler and rk4 solvers
+They are also compiled with Numba when it is available
+'''
+def _euler(x, t, f, h):
+    xNew = x + h * f(x,t)
+    return xNew
+
+def _rk4(x, t, f, h): 
+    k1 = h * f(x,t)
+    k2 = h * f(x + k1/2.0 , t + h/2.0)
+    k3 = h * f(x + k2/2.0 , t + h/2.0)
+    k4 = h * f(x + k3     , t + h)
+    xNew = x + ( k1/6 + k2/3 + k3/3 + k4/6 )
+    return xNew
+
+'''
+_rk4Array
+rk4 step for array states
+Intermediate results are calculated in place on work buffers
+allocated in only one block for each call
+so that f can call rk4 and several threads can use it
+'''
+def _rk4Array(x, t, f, h):
+    d = f(x,t)
+    dtype = np.result_type(x, d, 1.0)
+    k1, k2, k3, k4, tmp = np.empty((5,)+x.shape, dtype)
+    np.multiply(d, h, out=k1)
+    np.multiply(k1, 0.5, out=tmp)
+    tmp += x
+    np.multiply(f(tmp, t + h/2.0), h, out=k2)
+    np.multiply(k2, 0.5, out=tmp)
+    tmp += x
+    np.multiply(f(tmp, t + h/2.0), h, out=k3)
+    np.add(x, k3, out=tmp)
+    np.multiply(f(tmp, t + h), h, out=k4)
+    # tmp = (k1 + 2*k2 + 2*k3 + k4)/6
+    np.add(k2, k3, out=tmp)
+    tmp *= 2.0
+    tmp += k1
+    tmp += k4
+    tmp *= 1.0/6.0
+    return x + tmp
+
+'''
+_rk4Py
+Python rk4 step that selects the array version when possible
+'''
+def _rk4Py(x, t, f, h):
+    if isinstance(x, np.ndarray) and x.ndim > 0:
+        return _rk4Array(x, t, f, h)
+    return _rk4(x, t, f, h)
+
+'''
+_rk45
+Dormand-Prince embedded Runge-Kutta 4(5) step
+Returns:
+   xNew  : 5th order value of x at time t+h
+   hNext : Proposed next time step
+   err   : Error norm relative to the tolerances
+           The step should only be accepted if err <= 1
+'''
+def _rk45(x, t, f, h, atol, rtol):
+    k1 = f(x,t)
+    k2 = f(x + h*(k1/5.0), t + h/5.0)
+    k3 = f(x + h*(3.0/40*k1 + 9.0/40*k2), t + 3.0*h/10)
+    k4 = f(x + h*(44.0/45*k1 - 56.0/15*k2 + 32.0/9*k3), t + 4.0*h/5)
+    k5 = f(x + h*(19372.0/6561*k1 - 25360.0/2187*k2 + 64448.0/6561*k3
+                  - 212.0/729*k4), t + 8.0*h/9)
+    k6 = f(x + h*(9017.0/3168*k1 - 355.0/33*k2 + 46732.0/5247*k3
+                  + 49.0/176*k4 - 5103.0/18656*k5), t + h)
+    xNew = x + h*(35.0/384*k1 + 500.0/1113*k3 + 125.0/192*k4
+                  - 2187.0/6784*k5 + 11.0/84*k6)
+    k7 = f(xNew, t + h)
+    # Difference between the 5th and 4th order solutions
+    e = h*(71.0/57600*k1 - 71.0/16695*k3 + 71.0/1920*k4 - 17253.0/339200*k5
+           + 22.0/525*k6 - 1.0/40*k7)
+    # RMS error norm relative to the tolerances
+    sc = atol + rtol*np.maximum(np.abs(x), np.abs(xNew))
+    r = e/sc
+    err = np.sqrt(np.sum(r*r)/np.size(r))
+    # Next step with 0.9 safety factor limited between h/5 and 5h
+    if err == 0.0:
+        factor = 5.0
+    else:
+        factor = min(5.0, max(0.2, 0.9*err**(-0.2)))
+    return xNew, h*factor, err
+
+'''
+_rk45Loop
+Integrates from t0 to tEnd repeating the rejected steps
+A step with a non finite error, like when f returns NaN,
+is rejected and repeated with h/5
+Raises ValueError if a rejected step needs a time step below hmin
+or if there are more than maxSteps steps
+Returns the lists of accepted times and states
+'''
+def _rk45Loop(x0, f, t0, tEnd, h, atol, rtol, step, hmin, maxSteps):
+    ts = [t0]
+    xs = [x0]
+    t = t0
+    x = x0
+    nSteps = 0
+    while t < tEnd:
+        nSteps += 1
+        if nSteps > maxSteps:
+            raise ValueError('integrateAdaptive: too many steps')
+        if t + h > tEnd:
+            h = tEnd - t
+        xNew, hNext, err = step(x, t, f, h, atol, rtol)
+        if err <= 1.0:
+            t = t + h
+            x = xNew
+            ts.append(t)
+            xs.append(x)
+        else:
+            if not np.isfinite(err):
+                hNext = h*0.2
+            if hNext < hmin:
+                raise ValueError('integrateAdaptive: time step below hmin')
+        h = hNext
+    return ts, xs
+
+'''
+_rk4Traj and _rk4Batch
+Integrate a full trajectory using the step function
+Paramenters:
+   out  : Preallocated output array with the initial state in out[0]
+   f    : function f(x,t)
+   t0   : Initial time
+   h    : time step interval
+   step : Step function (_rk4Py or the compiled _rk4)
+In _rk4Batch the second index of out selects the trajectory
+'''
+def _rk4Traj(out, f, t0, h, step):
+    for i in range(out.shape[0]-1):
+        out[i+1] = step(out[i], t0 + i*h, f, h)
+
+def _rk4Batch(out, f, t0, h, step):
+    for j in prange(out.shape[1]):
+        for i in range(out.shape[0]-1):
+            out[i+1,j] = step(out[i,j], t0 + i*h, f, h)
+
+if numbaFound:
+    _eulerJit    = numba.njit(cache=True)(_euler)
+    _rk4Jit      = numba.njit(cache=True)(_rk4)
+    _rk4TrajJit  = numba.njit(cache=True)(_rk4Traj)
+    _rk4BatchJit = numba.njit(parallel=True,cache=True)(_rk4Batch)
+    _rk45Jit     = numba.njit(cache=True)(_rk45)
+    _rk45LoopJit = numba.njit(cache=True)(_rk45Loop)
+
+'''
+_isJitted
+Indicates if f is a Numba compiled function
+'''
+def _isJitted(f):
+    return numbaFound and isinstance(f, CPUDispatcher)
+
+'''
+_warnPython
+Warns that rk4 is using a Python f although Numba is available
+The warnings module shows it only once for each calling line
+'''
+def _warnPython():
+    if numbaFound:
+        warnings.warn("rk4 is using a Python function f. "
+                      "Use jitRhs(f) to compile it with Numba",
+                      RuntimeWarning, stacklevel=3)
+
+# Public functions ######################################################################
+
+'''
+@jitRhs@
+jitRhs(f)
+Compiles the function f(x,t) of a dynamical system with Numba
+so that euler, rk4 and rk4Integrate run fully compiled
+f can only use the Python and NumPy subset supported by Numba
+
+Required parameters:
+   f : function f(x,t)
+
+Returns the compiled function or f itself if Numba is not available
+'''
+def jitRhs(f):
+    if not numbaFound:
+        return f
+    if _isJitted(f):
+        return f
+    return numba.njit(f)
+
 '''
 Calculates the Euler solution of a dynamical system
 System is defined as:
@@ -271,10 +720,15 @@ Parameters:
    h : time step interval
 Returns:
    xNew : New value of x at time t+h
+If f is compiled with numba.njit the whole step runs compiled
+Float states use the _jcalc_ext extension if it is available
 '''
 def euler(x, t, f, h):
-    xNew = x + h * f(x,t)
-    return xNew
+    if _isJitted(f):
+        return _eulerJit(x, t, f, h)
+    if extFound and type(x) is float:
+        return _jcalc_ext.eulerScalar(x, t, f, h)
+    return _euler(x, t, f, h)
     
 '''
 Calculates the 4th order Runge-Kutta approximation for a dynamical system
@@ -287,14 +741,121 @@ Parameters:
    h : time step interval
 Returns:
    xNew : New value of x at time t+h
+If f is compiled with numba.njit the whole step runs compiled
+Float states use the _jcalc_ext extension if it is available
 '''    
 def rk4(x, t, f, h): 
-    k1 = h * f(x,t)
-    k2 = h * f(x + k1/2.0 , t + h/2.0)
-    k3 = h * f(x + k2/2.0 , t + h/2.0)
-    k4 = h * f(x + k3     , t + h)
-    xNew = x + ( k1/6 + k2/3 + k3/3 + k4/6 )
-    return xNew    
+    if _isJitted(f):
+        return _rk4Jit(x, t, f, h)
+    if extFound and type(x) is float:
+        return _jcalc_ext.rk4Scalar(x, t, f, h)
+    _warnPython()
+    return _rk4Py(x, t, f, h)
+    
+'''
+@rk4Integrate@
+rk4Integrate(x0,f,t0,h,nSteps)
+Integrates a full trajectory with the 4th order Runge-Kutta method
+System is defined as:
+ dx/dt = f(x,t)
+Parameters:
+       x0 : Initial state variable or vector
+            A 2D array is a batch of initial state vectors (one per row)
+        f : function f(x,t)
+       t0 : Initial time
+        h : time step interval
+   nSteps : Number of steps
+Returns:
+   out : Array with the state at times t0, t0+h ... t0+nSteps*h
+         Batches have shape (nSteps+1, trajectories, states)
+If f is compiled with numba.njit the trajectory is calculated compiled
+and the trajectories of a batch are calculated in parallel
+'''
+def rk4Integrate(x0, f, t0, h, nSteps):
+    x0 = np.asarray(x0, dtype=float)
+    out = np.empty((nSteps+1,)+x0.shape)
+    out[0] = x0
+    if _isJitted(f):
+        if x0.ndim == 2:
+            _rk4BatchJit(out, f, t0, h, _rk4Jit)
+        else:
+            _rk4TrajJit(out, f, t0, h, _rk4Jit)
+    else:
+        _warnPython()
+        if x0.ndim == 2:
+            _rk4Batch(out, f, t0, h, _rk4Py)
+        else:
+            _rk4Traj(out, f, t0, h, _rk4Py)
+    return out
+    
+'''
+@rk45@
+rk45(x,t,f,h,atol,rtol)
+Calculates one adaptive Dormand-Prince Runge-Kutta 4(5) step
+System is defined as:
+ dx/dt = f(x,t)
+Parameters:
+      x : State variable or vector 
+      t : Current time
+      f : function f(x,t)
+      h : time step interval
+   atol : Absolute tolerance (defaults to 1e-6)
+   rtol : Relative tolerance (defaults to 1e-3)
+Returns:
+   xNew  : New value of x at time t+h
+   hNext : Time step proposed for the next step
+   err   : Error relative to the tolerances
+           If err > 1 the step should be repeated using hNext
+If f is compiled with numba.njit the whole step runs compiled
+'''
+def rk45(x, t, f, h, atol=1e-6, rtol=1e-3):
+    if _isJitted(f):
+        return _rk45Jit(x, t, f, h, atol, rtol)
+    return _rk45(x, t, f, h, atol, rtol)
+
+'''
+@integrateAdaptive@
+integrateAdaptive(f,x0,t0,tEnd,atol,rtol,h,hmin,maxSteps)
+Integrates a dynamical system from t0 to tEnd with adaptive
+Dormand-Prince Runge-Kutta 4(5) steps
+System is defined as:
+ dx/dt = f(x,t)
+Parameters:
+      f : function f(x,t)
+     x0 : Initial state variable or vector
+     t0 : Initial time
+   tEnd : Final time
+   atol : Absolute tolerance (defaults to 1e-6)
+   rtol : Relative tolerance (defaults to 1e-3)
+      h : Initial time step (defaults to (tEnd-t0)/100)
+   hmin : Minimum time step (defaults to 1e-12*(tEnd-t0))
+   maxSteps : Maximum number of steps, including the rejected ones
+              (defaults to 100000)
+Returns:
+   t : Array of times of the accepted steps
+   x : Array of states at those times
+Raises ValueError if the step would go below hmin or if there are
+more than maxSteps steps, like when f returns NaN or inf
+If f is compiled with numba.njit the integration runs compiled
+'''
+def integrateAdaptive(f, x0, t0, tEnd, atol=1e-6, rtol=1e-3, h=None,
+                      hmin=None, maxSteps=100000):
+    if h is None:
+        h = (tEnd-t0)/100.0
+    if hmin is None:
+        hmin = 1e-12*(tEnd-t0)
+    if np.ndim(x0) > 0:
+        x0 = np.asarray(x0, dtype=float)
+    else:
+        x0 = float(x0)
+    t0 = float(t0)
+    if _isJitted(f):
+        ts,xs = _rk45LoopJit(x0, f, t0, tEnd, h, atol, rtol, _rk45Jit,
+                                  hmin, maxSteps)
+    else:
+        ts,xs = _rk45Loop(x0, f, t0, tEnd, h, atol, rtol, _rk45,
+                               hmin, maxSteps)
+    return np.array(ts),np.array(xs)
     
 #########################################################################################
 # GEOMETRIC CODE                                                                        #
@@ -340,6 +901,7 @@ Obtain a divider from the thevenin equivalent
 Returns a vector with:
   Ra,Rb
 A -1.0 value means infinite resistance  
+The calculation has no branches so it also operates on arrays
 '''    
 def thevenin2divider(va,vb,vth,rth):
     vaa=va*1.0
@@ -347,15 +909,15 @@ def thevenin2divider(va,vb,vth,rth):
     vthh=vth*1.0
     rthh=rth*1.0
     
-    if vaa-vthh == 0.0:
-        rb = -1.0
-    else:    
-        rb=(rthh*vthh-vbb*rthh+(vaa-vthh)*rthh)/(vaa-vthh) 
+    # Denominators and zero flags (1.0 if zero, 0.0 if not)
+    d1 = vaa-vthh
+    d2 = vthh-vbb
+    z1 = (d1 == 0.0)*1.0
+    z2 = (d2 == 0.0)*1.0
     
-    if vthh-vbb == 0.0:
-        ra = -1.0
-    else:    
-        ra=rb*(vaa-vthh)/(vthh-vbb)
+    # Zero denominators are replaced by 1 and the result by -1.0
+    rb=(rthh*vthh-vbb*rthh+d1*rthh)/(d1+z1)*(1.0-z1) - z1
+    ra=rb*d1/(d2+z2)*(1.0-z2) - z2
         
     return ra,rb
     
@@ -397,3 +959,114 @@ def niAmplifierR(a,b,rs):
     vr=-bb*rss/rf
     return rf,vr
     
+#########################################################################################
+# PARAMETER SWEEPS                                                                      #
+#########################################################################################
+
+'''
+The ...V functions are versions of the geometric and DC electronics
+functions that operate on arrays of values
+Arguments can be arrays or numbers and are broadcasted together
+Each function returns two arrays with the broadcasted shape
+If Numba is available the calculations are compiled and run in parallel
+If the _jcalc_aot module is available its precompiled kernels are used
+'''
+
+# Internal functions ####################################################################
+
+# Compiled versions of the scalar functions
+_normalizeLineJit     = _jit(normalizeLine)
+_divider2theveninJit  = _jit(divider2thevenin)
+_thevenin2dividerJit  = _jit(thevenin2divider)
+_niAmplifierJit       = _jit(niAmplifier)
+_niAmplifierRJit      = _jit(niAmplifierR)
+
+'''
+_sweep
+Broadcasts the arguments, calls the kernel and reshapes the results
+Paramenters:
+  kernel : Function kernel(*args,out1,out2) that operates on 1D arrays
+   *args : Arguments of the swept function
+Returns:
+  out1, out2 : Result arrays
+'''
+def _sweep(kernel,*args):
+    args = np.broadcast_arrays(*[np.asarray(a,dtype=float) for a in args])
+    shape = args[0].shape
+    args = [np.ascontiguousarray(a).ravel() for a in args]
+    out1 = np.empty(args[0].size)
+    out2 = np.empty(args[0].size)
+    kernel(*(args+[out1,out2]))
+    return out1.reshape(shape),out2.reshape(shape)
+
+@_pjit
+def _normalizeLineK(x1,y1,x2,y2,a,b):
+    for i in prange(x1.size):
+        a[i],b[i] = _normalizeLineJit(x1[i],y1[i],x2[i],y2[i])
+
+@_pjit
+def _divider2theveninK(va,vb,ra,rb,vth,rth):
+    for i in prange(va.size):
+        vth[i],rth[i] = _divider2theveninJit(va[i],vb[i],ra[i],rb[i])
+
+@_pjit
+def _thevenin2dividerK(va,vb,vth,rth,ra,rb):
+    for i in prange(va.size):
+        ra[i],rb[i] = _thevenin2dividerJit(va[i],vb[i],vth[i],rth[i])
+
+@_pjit
+def _niAmplifierK(vr,rs,rf,a,b):
+    for i in prange(vr.size):
+        a[i],b[i] = _niAmplifierJit(vr[i],rs[i],rf[i])
+
+@_pjit
+def _niAmplifierRK(a,b,rs,rf,vr):
+    for i in prange(a.size):
+        rf[i],vr[i] = _niAmplifierRJit(a[i],b[i],rs[i])
+
+# Use the ahead of time compiled kernels if available
+# They don't need Numba nor JIT warmup
+if aotFound:
+    _normalizeLineK    = _jcalc_aot.normalizeLineK
+    _divider2theveninK = _jcalc_aot.divider2theveninK
+    _thevenin2dividerK = _jcalc_aot.thevenin2dividerK
+    _niAmplifierK      = _jcalc_aot.niAmplifierK
+    _niAmplifierRK     = _jcalc_aot.niAmplifierRK
+
+# Public functions ######################################################################
+
+'''
+Array version of normalizeLine
+Returns arrays A, B
+'''
+def normalizeLineV(x1,y1,x2,y2):
+    return _sweep(_normalizeLineK,x1,y1,x2,y2)
+
+'''
+Array version of divider2thevenin
+Returns arrays Vth, Rth
+'''
+def divider2theveninV(va,vb,ra,rb):
+    return _sweep(_divider2theveninK,va,vb,ra,rb)
+
+'''
+Array version of thevenin2divider
+Returns arrays Ra, Rb
+A -1.0 value means infinite resistance
+'''
+def thevenin2dividerV(va,vb,vth,rth):
+    return _sweep(_thevenin2dividerK,va,vb,vth,rth)
+
+'''
+Array version of niAmplifier
+Returns arrays A, B
+'''
+def niAmplifierV(vr,rs,rf):
+    return _sweep(_niAmplifierK,vr,rs,rf)
+
+'''
+Array version of niAmplifierR
+Returns arrays Rf, Vr
+'''
+def niAmplifierRV(a,b,rs):
+    return _sweep(_niAmplifierRK,a,b,rs)
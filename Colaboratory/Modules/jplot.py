@@ -7,13 +7,34 @@ Includes funtions related for drawing curves
 History:
   11/03/2018 : First version
   13/03/2018 : Add version string
+  15/10/2026 : Plot functions selected from a table
+               Batched curves in plot1n and plotnn
+               Added backgroundRender and flush
+               Added useFastBackend
+               x can be None in plot11 and plot1n
+               Single curve path in plot1n and plotnn
+               Cached default x sequences
+               Grid and limits set on the axes object
+               Plot border drawn with the axes spines
+               Equal length plotnn curves drawn as 2D arrays
+               Legend built from the plotted lines with ax.legend
+               Added useFigPool and resetPool
 '''
 
 from __future__ import print_function
 
 import numpy as np               # Import numpy for numeric calculations
-import pylab as pl               # Import pylab
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.axes import Axes
+
+import io
+import threading
+try:
+    import queue                 # Python 3
+except ImportError:
+    import Queue as queue        # Python 2.7
 
 # Version string
 version = '13/3/2018'
@@ -22,6 +43,116 @@ version = '13/3/2018'
 # DRAWING CODE                                                                          #
 #########################################################################################
 
+# Background rendering ##################################################################
+
+# Background rendering not enabled by default
+bRender = False
+
+# Queue of figures pending to render and its worker thread
+_renderQueue  = queue.Queue()
+_renderThread = None
+
+'''
+_showPNG
+Renders a figure to PNG and displays it
+'''
+def _showPNG(fig):
+    # IPython is only needed to display images
+    from IPython.display import display, Image
+    buf = io.BytesIO()
+    fig.savefig(buf,format='png')
+    display(Image(buf.getvalue()))
+
+'''
+_renderWorker
+Renders to PNG and displays the figures sent to the render queue
+Runs in the background render thread
+'''
+def _renderWorker():
+    while True:
+        fig = _renderQueue.get()
+        try:
+            _showPNG(fig)
+        finally:
+            _renderQueue.task_done()
+
+'''
+@backgroundRender@
+backgroundRender(flag)
+Renders the plots in a background thread so the plot
+commands return without waiting for the drawing
+Figures are shown as PNG images
+Use flush() to wait for the pending plots
+
+Optional parameters:
+   flag : Set background rendering (defaults to True)
+
+Returns nothing
+'''
+def backgroundRender(flag=True):
+    global bRender,_renderThread
+    bRender = flag
+    if flag and _renderThread is None:
+        _renderThread = threading.Thread(target=_renderWorker)
+        _renderThread.daemon = True
+        _renderThread.start()
+
+'''
+@flush@
+flush()
+Waits until all plots sent to background rendering are shown
+
+Returns nothing
+'''
+def flush():
+    _renderQueue.join()
+
+'''
+@useFastBackend@
+useFastBackend()
+Selects the non interactive Agg backend
+Plots are rendered to PNG and displayed as images
+That is faster than the interactive backends
+
+Returns nothing
+'''
+def useFastBackend():
+    matplotlib.use('Agg',force=True)
+
+# Figure pool ###########################################################################
+
+# Figure pool not enabled by default
+figPool = False
+
+# Figures available for reuse
+_FIG_POOL = []
+
+'''
+@useFigPool@
+useFigPool(flag)
+Reuses the figures of previous plots instead of creating new ones
+Pooled figures are shown as PNG images
+Use resetPool() to release the pooled figures
+
+Optional parameters:
+   flag : Set figure reuse (defaults to True)
+
+Returns nothing
+'''
+def useFigPool(flag=True):
+    global figPool
+    figPool = flag
+
+'''
+@resetPool@
+resetPool()
+Releases all figures in the figure pool
+
+Returns nothing
+'''
+def resetPool():
+    del _FIG_POOL[:]
+
 # Internal functions ####################################################################
 
 '''
@@ -32,19 +163,25 @@ Paramenters:
   xt    : x label of the plot (defaults to none)
   yt    : y label of the plot (defaults to none)
   grid  : Determines if there is grid (defaults to True)
+  fig   : Figure to reuse (defaults to a pooled or new one)
 Returns:
   fig : Figure object
   ax  : Axes object  
 '''
-def _plotStart(title="",xt="",yt="",grid=True):
-    fig=plt.figure()
+def _plotStart(title="",xt="",yt="",grid=True,fig=None):
+    if fig is None and figPool and len(_FIG_POOL):
+        fig = _FIG_POOL.pop()
+    if fig is None:
+        fig = plt.figure()
+    else:
+        fig.clear()
     ax = fig.add_subplot(111)
     ax.set_facecolor("white")
     ax.set_title(title)
     ax.set_xlabel(xt)
     ax.set_ylabel(yt)
     if (grid):
-        plt.grid(True,color="lightgrey",linestyle='--')
+        ax.grid(True,color="lightgrey",linestyle='--')
     return fig,ax
 
 '''
@@ -55,37 +192,92 @@ Paramenters:
   ax       : Axes obtained from plotStart
   labels   : List of labels for the curves (defaults to none)
   location : Location for labels (defaults to 'best')
+  handles  : List of lines for the labels (defaults to none)
 Returns nothing  
 '''    
-def _plotEnd(fig,ax,labels=[],location='best'):
-    if not labels == []:
-        pl.legend(loc=location)
-    xmin, xmax = plt.xlim()
-    ymin, ymax = plt.ylim()
-    ax.axvline(x=xmin,linewidth=2, color='black')
-    ax.axvline(x=xmax,linewidth=2, color='black')
-    ax.axhline(y=ymin,linewidth=2, color='black')
-    ax.axhline(y=ymax,linewidth=2, color='black')
-    plt.show()
+def _plotEnd(fig,ax,labels=[],location='best',handles=None):
+    if len(labels):
+        if handles is None:
+            ax.legend(loc=location)
+        else:
+            ax.legend(handles,labels,loc=location)
+    # Black border using the axes spines
+    for side in ('top','bottom','left','right'):
+        ax.spines[side].set_linewidth(2)
+        ax.spines[side].set_color('black')
+    if bRender:
+        # Detach the figure from pyplot and render it in background
+        plt.close(fig)
+        _renderQueue.put(fig)
+    elif figPool:
+        # Show the figure and keep it for reuse
+        _showPNG(fig)
+        plt.close(fig)
+        _FIG_POOL.append(fig)
+    elif matplotlib.get_backend().lower() == 'agg':
+        _showPNG(fig)
+        plt.close(fig)
+    else:
+        plt.show()
+
+# Plot functions with (logx,logy) keys
+# They are Axes methods so they don't depend on the current pyplot figure
+_PLOT_FUNCS = { (False,False) : Axes.plot
+              , (True,False)  : Axes.semilogx
+              , (False,True)  : Axes.semilogy
+              , (True,True)   : Axes.loglog }
 
 '''
 _plotXY
 Plot two magnitudes using log if needed
 Used by the plot11, plot1n and plotnn commands
+Returns the list of plotted lines
 '''
-def _plotXY(x,y,label="",logx=False,logy=False):
-    if not logx and not logy:
-        pl.plot(x,y,label=label)
-        return
-    if logx and not logy:
-        pl.semilogx(x,y,label=label)
-        return
-    if logy and not logx:
-        pl.semilogy(x,y,label=label)
-        return
-    if logx and logy:
-        pl.loglog(x,y,label=label)
-        return
+def _plotXY(ax,x,y,label="",logx=False,logy=False):
+    return _PLOT_FUNCS[(logx,logy)](ax,x,y,label=label)
+
+# Cache of read only sequences for the x axis with length keys
+_seqCache = {}
+
+'''
+_seq
+Returns a read only sequence 0..n-1 for the x axis
+Sequences are cached so repeated plots of the same length
+don't allocate a new one
+'''
+def _seq(n):
+    try:
+        return _seqCache[n]
+    except KeyError:
+        if len(_seqCache) >= 32:
+            _seqCache.clear()
+        a = np.arange(0,n)
+        a.setflags(write=False)
+        _seqCache[n] = a
+        return a
+
+'''
+_sameLength
+Indicates if all vectors in a list have the same length
+Returns True for an empty list
+'''
+def _sameLength(vlist):
+    if len(vlist) == 0:
+        return True
+    n = len(vlist[0])
+    return all(len(v) == n for v in vlist)
+
+'''
+_plotCollection
+Plot several unlabeled curves in linear axes as only one LineCollection
+Colors follow the axes color cycle
+Used by the plotnn command
+'''
+def _plotCollection(ax,xlist,ylist):
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    segments = [np.column_stack((x,y)) for x,y in zip(xlist,ylist)]
+    ax.add_collection(LineCollection(segments,colors=colors))
+    ax.autoscale_view()
      
 # Public functions ######################################################################
      
@@ -93,7 +285,7 @@ def _plotXY(x,y,label="",logx=False,logy=False):
 @plot11@
 plot11(x,y,title,xt,yt,logx,logy)
 Plot one input against one output
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -113,12 +305,12 @@ Returns nothing
 def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True):
 
     # Generate sequence if x is not provided
-    if x == []:
-        x = np.arange(0,len(y))
+    if x is None or len(x) == 0:
+        x = _seq(len(y))
        
     fig,ax = _plotStart(title,xt,yt,grid)
 
-    _plotXY(x,y,logx=logx,logy=logy)
+    _plotXY(ax,x,y,logx=logx,logy=logy)
     
     _plotEnd(fig,ax)
     
@@ -126,7 +318,7 @@ def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True):
 @plot1n@
 plot1n(x,ylist,title,xt,yt,labels,location,logx,logy)
 Plot one input against several outputs
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -148,19 +340,24 @@ Returns nothing
 def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='best',logx=False,logy=False,grid=True):
 
     # Generate sequence is x is not provided
-    if x == []:
-        x = np.arange(0,len(ylist[0]))        
+    if x is None or len(x) == 0:
+        x = _seq(len(ylist[0]))        
         
     fig,ax=_plotStart(title,xt,yt,grid)
     
-    if labels == []:
-        for y in ylist:
-            _plotXY(x,y,logx=logx,logy=logy)
+    if len(ylist) == 1:
+        # Only one curve
+        lines = _plotXY(ax,x,ylist[0],logx=logx,logy=logy)
+    elif len(ylist) > 1 and not logx and not logy:
+        # All curves in only one call
+        lines = ax.plot(x,np.column_stack(ylist))
     else:
-        for y,lbl in zip(ylist,labels):
-            _plotXY(x,y,label=lbl,logx=logx,logy=logy)
+        plotFn = _PLOT_FUNCS[(logx,logy)]
+        lines = []
+        for y in ylist:
+            lines += plotFn(ax,x,y)
 
-    _plotEnd(fig,ax,labels,location)   
+    _plotEnd(fig,ax,labels,location,lines)   
   
 '''
 @plotnn@
@@ -187,14 +384,23 @@ def plotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='best',logx=False
 
     fig,ax=_plotStart(title,xt,yt,grid)
     
-    if labels == []:
-        for x,y in zip(xlist,ylist):
-            _plotXY(x,y,logx=logx,logy=logy)
+    plotFn = _PLOT_FUNCS[(logx,logy)]
+    if len(ylist) == 1:
+        # Only one curve
+        lines = plotFn(ax,xlist[0],ylist[0])
+    elif len(xlist) > 1 and _sameLength(xlist):
+        # Curves as columns of 2D arrays in only one call
+        lines = plotFn(ax,np.column_stack(xlist),np.column_stack(ylist))
+    elif len(labels) == 0 and not logx and not logy:
+        # Unlabeled curves in only one collection
+        _plotCollection(ax,xlist,ylist)
+        lines = []
     else:
-        for x,y,lbl in zip(xlist,ylist,labels):
-            _plotXY(x,y,label=lbl,logx=logx,logy=logy)
+        lines = []
+        for x,y in zip(xlist,ylist):
+            lines += plotFn(ax,x,y)
             
-    _plotEnd(fig,ax,labels,location)  
+    _plotEnd(fig,ax,labels,location,lines)  
     
 '''
 @plotHist@
@@ -217,7 +423,7 @@ def plotHist(v,bins=10,title="",xt="",yt="",grid=True):
 
     fig,ax = _plotStart(title,xt,yt,grid)
 
-    plt.hist(v,bins)
+    ax.hist(v,bins)
     
     _plotEnd(fig,ax)    
     
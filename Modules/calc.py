@@ -21,6 +21,25 @@ History:
   13/04/2018 : Corrected error in plot1n and plotnn   
   15/04/2018 : Add hook to plot functions
    2/07/2018 : Add interactive plots
+  15/10/2026 : f2s formats with '%#.*f' and trims the trailing zeros with rstrip
+               Added f2sArray
+               f2s and f2sci use the math module and accept zero
+               f2sci takes the powers of 10 from a table
+               plotXY and _jplotXY select the plot function from a table
+               Many unlabeled curves are drawn as a single LineCollection
+               plot11 and plot1n check for a missing x without comparing it to []
+               rk4 adds the slopes before scaling and runs compiled for Numba functions
+               Added printR again from the old copy in Tests
+               f2sci takes the prefixes from a table
+               Added reuse and show parameters to the plot functions
+               normalizeLine accepts arrays
+               Plot functions use the methods of their axes
+               Legend location defaults to 'upper right'
+               Plot functions close their own figure
+               Histograms use np.histogram and a single stairs artist
+               plot1n plots 2D arrays of curves in a single call
+               f2sci builds the exponent notation with a single format operation
+               Added makeRk4
 '''
 
 # Python 2.7 compatibility
@@ -30,8 +49,22 @@ from __future__ import division
 import numpy as np               # Import numpy for numeric calculations
 import pylab as pl               # Import pylab
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 import inspect
+import math
+
+# Numba is optional
+# If it is available rk4 runs compiled when f is compiled
+try:
+    import numba
+    try:
+        from numba.core.registry import CPUDispatcher
+    except ImportError:
+        from numba.targets.registry import CPUDispatcher
+    numbaFound = True
+except ImportError:
+    numbaFound = False
 
 version = '2/7/2018B'
 
@@ -41,10 +74,23 @@ colaboratory = False
 # Interactive plot not enabled by default
 iplots = False   
 
+# Plot function for each combination of logx and logy
+# Index is 2*logx+logy
+_plotFunctions = (pl.plot,pl.semilogy,pl.semilogx,pl.loglog)
+
+# Minimum number of unlabeled linear curves drawn as a single LineCollection
+collectionCurves = 10
+
 #########################################################################################
 # PRINTING CODE                                                                         #
 #########################################################################################
 
+# Powers of 10 from 1E-18 to 1E+24
+_POW10 = tuple(10.0**i for i in range(-18,25))
+
+# Prefixes for the powers of 1000 from 1E-18 to 1E+18
+_prefixes = ('a','f','p','n','u','m','','k','M','G','T','P','E')
+
 def f2s(v,nd=None):
     """
     f2s (float2string)
@@ -54,26 +100,33 @@ def f2s(v,nd=None):
     if less than one, uses three significant decimal places
     The optional parameter can fix the number of significant digits
     """
-    # Base number of decimals
+    # Zero has no significant digits
     a = abs(v)
+    if a == 0:
+        return '0.0'
+
+    # Base number of decimals
     if nd == None:
         ndec = 3
         if (a>=1000): ndec = 2
-        if (a<1): ndec = int(np.floor(3-np.log10(a)))
+        if (a<1): ndec = int(math.floor(3-math.log10(a)))
     else:
         ndec = nd
-        if (a<1): ndec = int(np.floor(nd-np.log10(a)))
-
-    # Check for significance
-    v2 = np.floor(v*10**ndec)/(10**ndec)
-    for i in range(0,ndec):
-        if np.floor(v2) == v2:
-            ndec = i+1
-            break
-        v2 = v2*10.0    
+        if (a<1): ndec = int(math.floor(nd-math.log10(a)))
+
+    # Return string rounded to ndec decimals without trailing zeros
+    # The '#' flag keeps the decimal point so that one zero can be kept
+    s = ('%#.*f' % (ndec,v)).rstrip('0')
+    if s[-1] == '.':
+        s = s + '0'
+    return s
     
-    # Return string
-    return ('{0:.%df}' % ndec).format(v)
+def f2sArray(v,nd=None):
+    """
+    Converts all values of a list or array to strings with f2s
+    Returns a list of strings
+    """
+    return [f2s(x,nd) for x in np.asarray(v,dtype=float).ravel()]
    
 def f2sci(v,unit='',nd=3,prefix=True):
     """
@@ -85,27 +138,24 @@ def f2sci(v,unit='',nd=3,prefix=True):
           nd : Number of decimal places (Default to 3) 
       prefix : Use standard prefixes for powers of 10 up to +/-18
     """
-    potH=['k','M','G','T','P','E']
-    potL=['m','u','n','p','f','a']
     a = abs(v)
-    ndec = int(np.floor(np.log10(a)))
-    pot = int(np.floor(ndec/3))
+    if a == 0:
+        return f2s(0) + ' ' + unit
+    ndec = int(math.floor(math.log10(a)))
+    pot = ndec//3
     exp = 3*pot
-    base = v/(10.0**exp)
+    if -18 <= exp <= 24:
+        base = v/_POW10[exp+18]
+    else:
+        base = v/(10.0**exp)
     s = f2s(base,nd)
     if pot==0: 
         return s + ' ' + unit
       
-    if (prefix):
-        if 1 <= pot <=6:
-            s = s + ' ' + potH[pot-1] + unit
-            return s
-        if 1 <= -pot <=6:
-            s = s + ' '+ potL[-pot-1] + unit
-            return s
+    if prefix and -6 <= pot <= 6:
+        return s + ' ' + _prefixes[pot+6] + unit
     
-    s = s + 'E' + ('{:+d}').format(exp) + ' ' + unit
-    return s    
+    return '%sE%+d %s' % (s,exp,unit)    
     
 def printVar(name,value,unit="",sci=True,prefix=True):
     """
@@ -116,6 +166,16 @@ def printVar(name,value,unit="",sci=True,prefix=True):
     else:
         print(name + " = " + f2s(value) + " " + unit)
            
+def printR(name,value,sci=True,prefix=True):
+    """
+    Print a resistor value
+    -1.0 means infinite
+    """
+    if value == -1.0:
+        print(name + " = Open")
+    else:
+        printVar(name,value,"Ohm",sci,prefix)
+           
 def printTitle(title):
     """
     Print a title with blank lines after and before
@@ -224,10 +284,10 @@ Paramenters:
   fig      : Figure object obtained from plotStart
   ax       : Axes obtained from plotStart
   labels   : List of labels for the curves (defaults to none)
-  location : Location for labels (defaults to 'best')
+  location : Location for labels (defaults to 'upper right')
 Returns nothing  
 '''    
-def _jplotEnd(fig,ax,labels=[],location='best'):
+def _jplotEnd(fig,ax,labels=[],location='upper right'):
     if not labels == []:
         pl.legend(loc=location)
     xmin, xmax = plt.xlim()
@@ -244,18 +304,49 @@ Plot two magnitudes using log if needed
 Used by the plot11, plot1n and plotnn commands
 '''
 def _jplotXY(x,y,label="",logx=False,logy=False):
-    if not logx and not logy:
-        pl.plot(x,y,label=label)
-        return
-    if logx and not logy:
-        pl.semilogx(x,y,label=label)
-        return
-    if logy and not logx:
-        pl.semilogy(x,y,label=label)
-        return
-    if logx and logy:
-        pl.loglog(x,y,label=label)
-        return
+    _plotFunctions[2*bool(logx)+bool(logy)](x,y,label=label)
+
+'''
+_useCollection
+Indicates if the curves should be drawn with _addLines
+That requires linear axes, no labels and at least
+collectionCurves curves
+'''
+def _useCollection(ylist,labels,logx,logy):
+    return (not logx and not logy and labels == []
+            and len(ylist) >= collectionCurves)
+
+'''
+_isMatrix
+Indicates if ylist is a 2D array with one curve in each row
+'''
+def _isMatrix(ylist):
+    return isinstance(ylist,np.ndarray) and ylist.ndim == 2
+
+'''
+_plotRows
+Plots all rows of the 2D array ylist against x in a single call
+Used by the plot1n and jplot1n commands
+'''
+def _plotRows(x,ylist,labels=[],logx=False,logy=False):
+    lines = _plotFunctions[2*bool(logx)+bool(logy)](x,ylist.T)
+    for line,lbl in zip(lines,labels):
+        line.set_label(lbl)
+
+'''
+_addLines
+Draws several curves as a single LineCollection
+Each curve takes the next color of the axes color cycle
+Used by the plot1n and plotnn commands
+'''
+def _addLines(ax,xlist,ylist):
+    segments = [np.column_stack((np.asarray(x,dtype=float),np.asarray(y,dtype=float)))
+                for x,y in zip(xlist,ylist)]
+    colors = pl.rcParams['axes.prop_cycle'].by_key().get('color',['b'])
+    lc = LineCollection(segments
+                        ,colors=[colors[i % len(colors)] for i in range(len(segments))])
+    ax.add_collection(lc)
+    ax.autoscale_view()
      
 # Public functions ######################################################################
      
@@ -270,12 +361,16 @@ def jplot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True,hook=None,x
     
     _jplotEnd(fig,ax)
     
-def jplot1n(x,ylist,title="",xt="",yt="",labels=[],location='best',logx=False,logy=False
+def jplot1n(x,ylist,title="",xt="",yt="",labels=[],location='upper right',logx=False,logy=False
            ,grid=True,hook=None,xlim=None,ylim=None):
     
     fig,ax=_jplotStart(title,xt,yt,grid,xlim,ylim)
     
-    if labels == []:
+    if _useCollection(ylist,labels,logx,logy):
+        _addLines(ax,[x]*len(ylist),ylist)
+    elif _isMatrix(ylist):
+        _plotRows(x,ylist,labels,logx,logy)
+    elif labels == []:
         for y in ylist:
             _jplotXY(x,y,logx=logx,logy=logy)
     else:
@@ -287,12 +382,14 @@ def jplot1n(x,ylist,title="",xt="",yt="",labels=[],location='best',logx=False,lo
             
     _jplotEnd(fig,ax,labels,location)   
   
-def jplotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='best',logx=False,logy=False
+def jplotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='upper right',logx=False,logy=False
            ,grid=True,hook=None,xlim=None,ylim=None):
 
     fig,ax=_jplotStart(title,xt,yt,grid,xlim,ylim)
     
-    if labels == []:
+    if _useCollection(ylist,labels,logx,logy):
+        _addLines(ax,xlist,ylist)
+    elif labels == []:
         for x,y in zip(xlist,ylist):
             _jplotXY(x,y,logx=logx,logy=logy)
     else:
@@ -308,7 +405,7 @@ def jplotHist(v,bins=10,title="",xt="",yt="",grid=True,hook=None):
 
     fig,ax = _jplotStart(title,xt,yt,grid)
 
-    plt.hist(v,bins)
+    _histogram(ax,v,bins)
     
     if not hook is None:
         hook()
@@ -320,29 +417,69 @@ def jplotHist(v,bins=10,title="",xt="",yt="",grid=True,hook=None):
 # DRAWING CODE                                                                          #
 #########################################################################################
 
+'''
+_histogram
+Draws the histogram of v as a single filled step artist
+Bins are calculated with np.histogram
+Used by plotHist and jplotHist
+'''
+def _histogram(ax,v,bins):
+    counts,edges = np.histogram(v,bins)
+    if hasattr(ax,'stairs'):
+        ax.stairs(counts,edges,fill=True)
+    else:
+        # Matplotlib older than 3.4
+        ax.fill_between(edges.repeat(2)[1:-1],0,counts.repeat(2))
+
+# Last figure created by the plot functions
+_lastFigure = None
+
+'''
+_plotFigure
+Starts the figure of a plot
+If reuse is True and the last figure is still open
+it is cleared and used again instead of creating a new one
+Returns:
+  fig : Figure object
+  ax  : Axes object
+'''
+def _plotFigure(reuse=False):
+    global _lastFigure
+    if reuse and _lastFigure is not None and plt.fignum_exists(_lastFigure.number):
+        plt.figure(_lastFigure.number)
+        if len(_lastFigure.axes) == 1:
+            ax = _lastFigure.axes[0]
+            ax.clear()
+            return _lastFigure,ax
+        _lastFigure.clf()
+    else:
+        _lastFigure = plt.figure(facecolor="white")
+    ax = _lastFigure.add_subplot(111)
+    return _lastFigure,ax
+
+'''
+_plotEnd
+Shows the plot if show is True and plots are not interactive
+The figure is closed after showing it unless it will be reused
+'''
+def _plotEnd(fig,reuse=False,show=True):
+    if show and not iplots:
+        pl.show()
+        if not reuse:
+            plt.close(fig)
+
 '''
 Plot two magnitudes using log if needed
 Used by the plot11, plot1n and plotnn commands
 '''
 def plotXY(x,y,label="",logx=False,logy=False):
-    if not logx and not logy:
-        pl.plot(x,y,label=label)
-        return
-    if logx and not logy:
-        pl.semilogx(x,y,label=label)
-        return
-    if logy and not logx:
-        pl.semilogy(x,y,label=label)
-        return
-    if logx and logy:
-        pl.loglog(x,y,label=label)
-        return
+    _plotFunctions[2*bool(logx)+bool(logy)](x,y,label=label)
         
 '''
 @plot11@
-plot11(x,y,title,xt,yt,logx,logy,grid,hook,xlim,ylim)
+plot11(x,y,title,xt,yt,logx,logy,grid,hook,xlim,ylim,reuse,show)
 Plot one input against one output
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -359,10 +496,13 @@ Optional parameters:
    hook : Function to be executed before showing the graph
    xlim : Tuple (min,max) with Limits for x axis
    ylim : Tuple (min,max) with Limits for y axis     
+  reuse : Draw on the last figure instead of a new one (Defaults to False)
+   show : Show the graph at the end (Defaults to True)
 
 Returns nothing
 '''
-def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None):
+def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None
+           ,reuse=False,show=True):
     # Check for x, y given as strings
     if type(x)==str:
         if xt=='': xt=x
@@ -372,7 +512,7 @@ def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True,hook=None,xl
         y = getVar(y,level=2)
  
     # Generate sequence if x is not provided
-    if x == []:
+    if x is None or (type(x) == list and len(x) == 0):
         x = np.arange(0,len(y))      
                 
     # Check colaboratory    
@@ -380,28 +520,26 @@ def plot11(x,y,title="",xt="",yt="",logx=False,logy=False,grid=True,hook=None,xl
         jplot11(x,y,title,xt,yt,logx,logy,grid,hook,xlim,ylim)
         return
  
-    plt.figure(facecolor="white")   # White border
+    fig,ax = _plotFigure(reuse)   # White border
     if xlim != None:
-        plt.xlim(xlim[0],xlim[1])
+        ax.set_xlim(xlim[0],xlim[1])
     if ylim != None:
-        plt.ylim(ylim[0],ylim[1])    
+        ax.set_ylim(ylim[0],ylim[1])    
     plotXY(x,y,logx=logx,logy=logy)
-    pl.xlabel(xt)
-    pl.ylabel(yt)
-    pl.title(title)
+    ax.set_xlabel(xt)
+    ax.set_ylabel(yt)
+    ax.set_title(title)
     if grid:
-        pl.grid()
+        ax.grid()
     if not hook is None:
         hook()    
-    if not iplots:    
-        pl.show()
-        pl.close()
+    _plotEnd(fig,reuse,show)
     
 '''
 @plot1n@
-plot1n(x,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim)
+plot1n(x,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim,reuse,show)
 Plot one input against several outputs
-If x is an empty list [], a sequence number
+If x is None or an empty list [], a sequence number
 will be used for the x axis
 
 Required parameters:
@@ -413,34 +551,39 @@ Optional parameters:
        xt : Label for x axis (Defaults to none or x string)
        yt : Label for y axis (Defaults to none)
    labels : List of legend labels (Defaults to none or ylist strings)
- location : Location for legend (Defaults to 'best')
+ location : Location for legend (Defaults to 'upper right')
+            'best' searches the free area and is slow with many curves
      logx : Use logarithmic x axis (Defaults to False)
      logy : Use logarithmic x axis (Defaults to False)
      grid : Draw a grid (Defaults to true)
      hook : Function to be executed before showing the graph     
      xlim : Tuple (min,max) with Limits for x axis
      ylim : Tuple (min,max) with Limits for y axis 
+    reuse : Draw on the last figure instead of a new one (Defaults to False)
+     show : Show the graph at the end (Defaults to True)
 
 Returns nothing
 '''
-def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='best'
-            ,logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None):
+def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='upper right'
+            ,logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None
+            ,reuse=False,show=True):
     # Check for x, y given as strings
     if type(x)==str:
         if xt=='': xt=x
         x = getVar(x,level=2)
     if type(ylist[0])==str and (labels==[]): 
         labels=ylist
-    ylist2 = []
-    for element in ylist:
-        if type(element) == str:
-            ylist2.append(getVar(element,level=2))
-        else:
-            ylist2.append(element)
-    ylist=ylist2        
+    if not isinstance(ylist,np.ndarray):
+        ylist2 = []
+        for element in ylist:
+            if type(element) == str:
+                ylist2.append(getVar(element,level=2))
+            else:
+                ylist2.append(element)
+        ylist=ylist2        
 
     # Generate sequence is x is not provided
-    if x == []:
+    if x is None or (type(x) == list and len(x) == 0):
         x = np.arange(0,len(ylist[0]))          
     
     # Check if we are in colaboratory
@@ -448,12 +591,16 @@ def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='best'
         jplot1n(x,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim)
         return    
         
-    plt.figure(facecolor="white")   # White border
+    fig,ax = _plotFigure(reuse)   # White border
     if xlim != None:
-        plt.xlim(xlim[0],xlim[1])
+        ax.set_xlim(xlim[0],xlim[1])
     if ylim != None:
-        plt.ylim(ylim[0],ylim[1])      
-    if labels == []:
+        ax.set_ylim(ylim[0],ylim[1])      
+    if _useCollection(ylist,labels,logx,logy):
+        _addLines(ax,[x]*len(ylist),ylist)
+    elif _isMatrix(ylist):
+        _plotRows(x,ylist,labels,logx,logy)
+    elif labels == []:
         for y in ylist:
             plotXY(x,y,logx=logx,logy=logy)
             #pl.plot(x,y)
@@ -461,22 +608,20 @@ def plot1n(x,ylist,title="",xt="",yt="",labels=[],location='best'
         for y,lbl in zip(ylist,labels):
             plotXY(x,y,label=lbl,logx=logx,logy=logy)
             #pl.plot(x,y,label=lbl)
-    pl.xlabel(xt)
-    pl.ylabel(yt)
-    pl.title(title)
+    ax.set_xlabel(xt)
+    ax.set_ylabel(yt)
+    ax.set_title(title)
     if grid:
-        pl.grid()
+        ax.grid()
     if not labels == []:
-        pl.legend(loc=location)
+        ax.legend(loc=location)
     if not hook is None:
         hook()    
-    if not iplots:    
-        pl.show()
-        pl.close()   
+    _plotEnd(fig,reuse,show)
   
 '''
 @plotnn@
-plotnn(xlist,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim)
+plotnn(xlist,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim,reuse,show)
 Plot several curves with different inputs and outputs
 
 Required parameters:
@@ -488,18 +633,22 @@ Optional parameters:
        xt : Label for x axis (Defaults to none or first string of xlist)
        yt : Label for y axis (Defaults to none)
    labels : List of legend labels (Defaults to none or ylist strings)
- location : Location for legend (Defaults to 'best')
+ location : Location for legend (Defaults to 'upper right')
+            'best' searches the free area and is slow with many curves
      logx : Use logarithmic x axis (Defaults to False)
      logy : Use logarithmic x axis (Defaults to False)
      grid : Draw a grid (Defaults to true)
      hook : Function to be executed before showing the graph     
      xlim : Tuple (min,max) with Limits for x axis
      ylim : Tuple (min,max) with Limits for y axis  
+    reuse : Draw on the last figure instead of a new one (Defaults to False)
+     show : Show the graph at the end (Defaults to True)
 
 Returns nothing
 '''
-def plotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='best'
-           ,logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None):
+def plotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='upper right'
+           ,logx=False,logy=False,grid=True,hook=None,xlim=None,ylim=None
+           ,reuse=False,show=True):
     # Check for x, y given as strings
     if type(xlist[0])==str:
         if xt=='': xt=xlist[0]
@@ -527,32 +676,32 @@ def plotnn(xlist,ylist,title="",xt="",yt="",labels=[],location='best'
         jplotnn(xlist,ylist,title,xt,yt,labels,location,logx,logy,grid,hook,xlim,ylim)
         return
 
-    plt.figure(facecolor="white")   # White border
+    fig,ax = _plotFigure(reuse)   # White border
     if xlim != None:
-        plt.xlim(xlim[0],xlim[1])
+        ax.set_xlim(xlim[0],xlim[1])
     if ylim != None:
-        plt.ylim(ylim[0],ylim[1])      
-    if labels == []:
+        ax.set_ylim(ylim[0],ylim[1])      
+    if _useCollection(ylist,labels,logx,logy):
+        _addLines(ax,xlist,ylist)
+    elif labels == []:
         for x,y in zip(xlist,ylist):
             plotXY(x,y,logx=logx,logy=logy)
     else:
         for x,y,lbl in zip(xlist,ylist,labels):
             plotXY(x,y,label=lbl,logx=logx,logy=logy)
-    pl.xlabel(xt)
-    pl.ylabel(yt)
-    pl.title(title)
-    pl.grid()
+    ax.set_xlabel(xt)
+    ax.set_ylabel(yt)
+    ax.set_title(title)
+    ax.grid()
     if not labels == []:
-        pl.legend(loc=location)
+        ax.legend(loc=location)
     if not hook is None:
         hook()
-    if not iplots:    
-        pl.show()
-        pl.close()  
+    _plotEnd(fig,reuse,show)
   
 '''
 @plotHist@
-plotHist(v,bins=10,title="",xt="",yt="",grid)
+plotHist(v,bins=10,title="",xt="",yt="",grid,reuse,show)
 Plot an histagram from provided data
 
 Required parameters:
@@ -564,10 +713,12 @@ Optional parameters:
        xt : Label for x axis (Defaults to none or x string)
        yt : Label for y axis (Defaults to none or 'Frequency' if v is string)
      grid : Use grid (Default to True)     
+    reuse : Draw on the last figure instead of a new one (Defaults to False)
+     show : Show the graph at the end (Defaults to True)
      
 Returns nothing   
 '''    
-def plotHist(v,bins=10,title="",xt="",yt="",grid=True):
+def plotHist(v,bins=10,title="",xt="",yt="",grid=True,reuse=False,show=True):
     # Check for v given as strings
     if type(v)==str:
         if xt=='': xt=v
@@ -579,18 +730,16 @@ def plotHist(v,bins=10,title="",xt="",yt="",grid=True):
         jplotHist(v,bins=bins,title=title,xt=xt,yt=yt,grid=grid)
         return  
       
-    plt.figure(facecolor="white")   # White border
+    fig,ax = _plotFigure(reuse)   # White border
     
-    plt.hist(v,bins)
+    _histogram(ax,v,bins)
     
-    pl.xlabel(xt)
-    pl.ylabel(yt)
-    pl.title(title)
+    ax.set_xlabel(xt)
+    ax.set_ylabel(yt)
+    ax.set_title(title)
     if grid:
-        pl.grid()
-    if not iplots:    
-        pl.show()
-        pl.close()
+        ax.grid()
+    _plotEnd(fig,reuse,show)
    
   
 #########################################################################################
@@ -624,15 +773,59 @@ Parameters:
    h : time step interval
 Returns:
    xNew : New value of x at time t+h
+If f is compiled with numba.njit the whole step runs compiled
 '''    
 def rk4(x, t, f, h): 
-    k1 = h * f(x,t)
-    k2 = h * f(x + k1/2.0 , t + h/2.0)
-    k3 = h * f(x + k2/2.0 , t + h/2.0)
-    k4 = h * f(x + k3     , t + h)
-    xNew = x + ( k1/6 + k2/3 + k3/3 + k4/6 )
+    if numbaFound and isinstance(f, CPUDispatcher):
+        return _rk4Jit(x, t, f, h)
+    return _rk4(x, t, f, h)
+    
+'''
+_rk4
+4th order Runge-Kutta step
+The slopes are added before scaling with h/6
+so that array states need fewer temporary arrays
+'''
+def _rk4(x, t, f, h):
+    h2 = h/2.0
+    k1 = f(x,t)
+    k2 = f(x + h2*k1, t + h2)
+    k3 = f(x + h2*k2, t + h2)
+    k4 = f(x + h*k3 , t + h)
+    xNew = x + (h/6.0)*(k1 + 2.0*(k2 + k3) + k4)
     return xNew
     
+if numbaFound:
+    _rk4Jit = numba.njit(cache=True)(_rk4)
+
+'''
+Generates a 4th order Runge-Kutta step function for a fixed f and h
+System is defined as:
+ dx/dt = f(x,t)
+Parameters:
+     f : function f(x,t)
+     h : time step interval
+   jit : Compile the step with Numba if available (defaults to True)
+         f must then only use the Python and NumPy subset supported by Numba
+Returns:
+   step : function step(x,t) that returns the new value of x at time t+h
+'''
+def makeRk4(f, h, jit=True):
+    h2 = h/2.0
+    h6 = h/6.0
+    h3 = h/3.0
+    if jit and numbaFound and not isinstance(f, CPUDispatcher):
+        f = numba.njit(f)
+    def step(x, t):
+        k1 = f(x,t)
+        k2 = f(x + h2*k1, t + h2)
+        k3 = f(x + h2*k2, t + h2)
+        k4 = f(x + h*k3 , t + h)
+        return x + h6*k1 + h3*k2 + h3*k3 + h6*k4
+    if jit and numbaFound:
+        return numba.njit(step)
+    return step
+    
 #########################################################################################
 # GEOMETRIC CODE                                                                        #
 #########################################################################################     
@@ -645,13 +838,14 @@ Parameters:
   y1 : First point y
   x2 : Second point x
   y2 : Second point y
+Parameters can also be NumPy arrays to normalize several lines at once
 Return:
   A : Slope
   B : Zero cross  
 '''
 def normalizeLine(x1,y1,x2,y2):
-    a = (y2*1.0 - y1*1.0)/(x2*1.0 - x1*1.0)
-    b = (y1*1.0 - a*x1)
+    a = (y2 - y1)/(x2 - x1)
+    b = y1 - a*x1
     return a,b
     
 
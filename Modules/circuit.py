@@ -9,7 +9,22 @@ History:
                Correct error in VM processing
                Change in some class member names
                Add Latex support with the show command
-  28/03/2018 : Add expr2func function             
+  28/03/2018 : Add expr2func function
+  15/10/2026 : Circuit equations are solved with SymEngine if available
+               KCL equations are built in a single pass over the components
+               R, C and L components store their admittance
+               Symbol substitutions are queued and applied together
+               evalList evaluates the constant subexpressions before compiling
+               Added the numba backend to evalList and evalFreqs
+               Components are _component objects with __slots__ instead of dictionaries
+               Components are also stored in lists for each kind
+               Nodes except 0 are kept in the nonZeroNodes tuple
+               Unknowns are sorted by name before solving
+               solve() reuses the symbolic solution if the circuit has not changed
+               subs() accepts a dictionary of values
+               Added evalParams
+               Common subexpressions are computed once in compiled functions
+               KCL equations access the nodes by index
 '''
 
 # Python 2.7 compatibility
@@ -20,6 +35,27 @@ from __future__ import division
 import sympy
 import numpy as np
 
+# SymEngine is optional
+# If it is available it is used to solve the circuit equations
+# Symbols and solutions given to the user are always SymPy objects
+try:
+    import symengine
+    symengineFound = True
+except ImportError:
+    symengineFound = False
+    
+# Numba is optional
+# It can be used to compile the functions used by evalList
+try:
+    import numba
+    try:
+        from numba.core.errors import NumbaError
+    except ImportError:
+        from numba.errors import NumbaError
+    numbaFound = True
+except ImportError:
+    numbaFound = False
+
 #from sympy.printing import latex
 from IPython.display import display, Math
 
@@ -75,6 +111,35 @@ def show(x):
     else:
         print(x)    
         
+
+class _component(object):
+    """
+    Component of a circuit
+    Fields:
+        k   : Kind ('r','c','l','vs','is','vm','im','cvs','cis')
+        n   : Name
+        n1  : First node
+        n2  : Second node
+        v   : Value or None
+        sy  : Symbol
+        isy : Current symbol of voltage sources
+        ctr : Controller component of controlled sources
+        adm : Admittance of R, C and L components
+    """
+    __slots__ = ('k','n','n1','n2','v','sy','isy','ctr','adm','i1','i2')
+    
+    def __init__(self):
+        self.v   = None
+        self.isy = None
+        self.ctr = None
+        self.adm = None
+        
+    def __getitem__(self,key):
+        # Access as the dictionaries used in previous versions
+        try:
+            return getattr(self,key)
+        except AttributeError:
+            raise KeyError(key)
     
 class circuit():
 
@@ -83,6 +148,9 @@ class circuit():
         Constructor to start a new circuit from zero
         """
         self.components = []   # List of components in the circuit
+        self.kinds = {}        # Lists of components for each kind
+        for k in ('r','c','l','vs','is','vm','im','cvs','cis'):
+            self.kinds[k] = []
         self.subsDic = {}      # Substitution dictionary for values
         self.meas = {}         # Dictionary of measurement objects
         self.sSolution = None  # Analytical solution (key = symbols)
@@ -90,10 +158,22 @@ class circuit():
         self.particular = None # Nummeric or "s" solution (key = names)
         self.name = {}         # Name dictionary with symbols for keys
         self.symbol = {}       # Symbol dictionary with name keys
+        self.solved = False    # Symbolic solution is up to date
+        self.paramFunc = None  # Numeric function of the solution
         if verbose:
             print('Starting a new circuit')
    
 # ADD COMPONENTS TO THE CIRCUIT #########################################################
+
+    def _addComponent(self,comp):
+        """
+        Add a component to the list of components
+        and to the list of its kind
+        """
+        self.components.append(comp)
+        self.kinds[comp.k].append(comp)
+        # The symbolic solution must be calculated again
+        self.solved = False
    
 # Component values are added to the substitution dictionary   
    
@@ -109,16 +189,18 @@ class circuit():
         """    
         # Define a symbol for the resistor
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'r'
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'r'
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
+        # Admittance
+        comp.adm = 1/sy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to substitution dictionary
@@ -143,16 +225,18 @@ class circuit():
         """    
         # Define a symbol for the capacitor
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'c'
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'c'
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
+        # Admittance
+        comp.adm = sy*s
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to substitution dictionary
@@ -177,16 +261,18 @@ class circuit():
         """    
         # Define a symbol for the inductor
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'l'
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'l'
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
+        # Admittance
+        comp.adm = 1/(sy*s)
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to substitution dictionary
@@ -211,24 +297,24 @@ class circuit():
         """    
         # Define a symbol for the supply
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'vs'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'vs'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
         # Create unknow for the current
         isy = sympy.Symbol('i'+name)
-        dict['isy'] = isy
+        comp.isy = isy
         # Add entry to symbol dictionary
         self.name[isy] = 'i'+name
         # Add to name dictionary
         self.symbol[name] = sy
         self.symbol['i'+name] = isy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add entry to substitution dictionary
         if value != None:
             self.subsDic[sy] = value
@@ -251,16 +337,16 @@ class circuit():
         """ 
         # Define a symbol for the supply
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'is'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'is'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to substitution dictionary
@@ -284,21 +370,21 @@ class circuit():
         """    
         # Define a symbol for the unknown
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'vm'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'vm'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.sy = sy
         # Add entry to symbol dictionary
         self.name[sy] = name
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add entry to measurement elements
-        self.meas[name] = dict
+        self.meas[name] = comp
         if verbose:
             print('Voltage measurement',name,'added between nodes',node1,'and',node2)
         return sy    
@@ -316,21 +402,21 @@ class circuit():
         """    
         # Define a symbol for the unknown
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'im'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['sy'] = sy
+        # Define the component
+        comp = _component()
+        comp.k  = 'im'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.sy = sy
         # Add entry to symbol dictionary
         self.name[sy] = name
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add entry to measurement elements
-        self.meas[name] = dict
+        self.meas[name] = comp
         if verbose:
             print('Current measurement',name,'added between nodes',node1,'and',node2)   
         return sy            
@@ -353,25 +439,25 @@ class circuit():
             raise circuitEx('CVS controller must be defined previously')        
         # Define a symbol for the CVS
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'cvs'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
-        dict['ctr'] = ctr
+        # Define the component
+        comp = _component()
+        comp.k  = 'cvs'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
+        comp.ctr = ctr
         # Create unknow for the current
         isy = sympy.Symbol('i'+name)
-        dict['isy'] = isy
+        comp.isy = isy
         # Add entry to symbol dictionary
         self.name[isy] = 'i'+name
         # Add to name dictionary
         self.symbol[name] = sy
         self.symbol['i'+name] = isy
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add entry to substitution dictionary
         if value != None:
             self.subsDic[sy] = value
@@ -400,17 +486,17 @@ class circuit():
             raise circuitEx('CIS controller must be defined previously')
         # Define a symbol for the CIS
         sy = sympy.Symbol(name)
-        # Define the dictionary
-        dict = {}
-        dict['k']  = 'cis'    
-        dict['n']  = name
-        dict['n1'] = node1
-        dict['n2'] = node2
-        dict['v']  = value
-        dict['sy'] = sy
-        dict['ctr'] = ctr
+        # Define the component
+        comp = _component()
+        comp.k  = 'cis'    
+        comp.n  = name
+        comp.n1 = node1
+        comp.n2 = node2
+        comp.v  = value
+        comp.sy = sy
+        comp.ctr = ctr
         # Add entry to list of components
-        self.components.append(dict)
+        self._addComponent(comp)
         # Add to name dictionary
         self.symbol[name] = sy
         # Add entry to substitution dictionary
@@ -428,18 +514,29 @@ class circuit():
     def _numNodes(self):
         """
         Get the list of nodes
+        nonZeroNodes is a tuple with all nodes except 0
+        nodeList also includes the 0 node
+        nodeIndex gives the position of each node in nodeList
+        and is used to set the node indexes i1, i2 of each component
         """
-        # Create a set of nodes
-        self.nodeList = set([])
         # Check if there are components in circuit    
         if len(self.components)==0:
             raise circuitEx('No components in the circuit')
-        # Add all nodes to the set    
+        # Add all nodes to a set    
+        nodes = set([])
+        for component in self.components:
+            nodes.add(component.n1)
+            nodes.add(component.n2)
+        # Check for the 0 node
+        if 0 not in nodes:
+            raise circuitEx('No 0 node in circuit')
+        nodes.discard(0)
+        self.nonZeroNodes = tuple(nodes)
+        self.nodeList = (0,) + self.nonZeroNodes
+        self.nodeIndex = dict((node,i) for i,node in enumerate(self.nodeList))
         for component in self.components:
-            self.nodeList.add(component['n1'])
-            self.nodeList.add(component['n2'])
-        # Convert set to list    
-        self.nodeList = list(self.nodeList)    
+            component.i1 = self.nodeIndex[component.n1]
+            component.i2 = self.nodeIndex[component.n2]
         if verbose:
             print('There are',len(self.nodeList),'nodes :')    
             for node in self.nodeList:
@@ -448,178 +545,93 @@ class circuit():
     def _nodeVariables(self):
         """
         Define the node variables in the circuit
-        They are associated to all nodes
+        They are associated to all nodes except 0
         They are also added to the unknowns list
+        nodeVarList has the same variables in nodeList order
+        with 0 for the 0 node
         """   
         # Define an empt dictionary with node variables
         self.nodeVars = {}
-        # Check for no nodes in the circuit    
-        if len(self.nodeList) == 0:
-            raise circuitEx('No nodes in the circuit')
+        self.nodeVarList = [0]
         if verbose:
             print('Creating node variables')  
-        zeroFound = False        
-        for node in self.nodeList:
-            if node == 0:
-                zeroFound = True
-            else:
-                name = 'v'+str(node)
-                ns = sympy.Symbol(name)
-                self.nodeVars[node] = ns
-                self.unknowns.add(ns)
-                # Add entry to symbol dictionary
-                self.name[ns] = name
-                # Add to name dictionary
-                self.symbol[name] = ns
-                if verbose:
-                    print('    ',name)    
-        if not zeroFound:
-            raise circuitEx('No 0 node in circuit')    
-
-    def _addRtoNode(self,res,eq,node):
-        """
-        Add resistor to node equation if it connect to it
-        """ 
-        # Nodes in the resistor
-        n1 = res['n1']
-        n2 = res['n2']
-        # Check if resistor is connected to n1
-        if n1 == node:
-            if n2 == 0:
-                eq = eq - self.nodeVars[n1]/res['sy']
-            else:
-                eq = eq - (self.nodeVars[n1]-self.nodeVars[n2])/res['sy']
-        # Check if resistor is connected to n2    
-        if n2 == node:
-            if n1 == 0:
-                eq = eq - self.nodeVars[n2]/res['sy']
-            else:
-                eq = eq - (self.nodeVars[n2]-self.nodeVars[n1])/res['sy']
-        return eq  
-
-    def _addCtoNode(self,cap,eq,node):
-        """
-        Add capacitor to node equation if it connect to it
-        """ 
-        # Nodes in the capacitor
-        n1 = cap['n1']
-        n2 = cap['n2']
-        # Check if capacitor is connected to n1
-        if n1 == node:
-            if n2 == 0:
-                eq = eq - cap['sy']*s*self.nodeVars[n1]
-            else:
-                eq = eq - cap['sy']*s*(self.nodeVars[n1]-self.nodeVars[n2])
-        # Check if capacitor is connected to n2    
-        if n2 == node:
-            if n1 == 0:
-                eq = eq - cap['sy']*s*self.nodeVars[n2]
-            else:
-                eq = eq - cap['sy']*s*(self.nodeVars[n2]-self.nodeVars[n1])
-        return eq        
-
-    def _addLtoNode(self,ind,eq,node):
-        """
-        Add inductir to node equation if it connect to it
-        """ 
-        # Nodes in the inductor
-        n1 = ind['n1']
-        n2 = ind['n2']
-        # Check if inductor is connected to n1
-        if n1 == node:
-            if n2 == 0:
-                eq = eq - self.nodeVars[n1]/(ind['sy']*s)
-            else:
-                eq = eq - (self.nodeVars[n1]-self.nodeVars[n2])/(ind['sy']*s)
-        # Check if inductor is connected to n2    
-        if n2 == node:
-            if n1 == 0:
-                eq = eq - self.nodeVars[n2]/(ind['sy']*s)
-            else:
-                eq = eq - (self.nodeVars[n2]-self.nodeVars[n1])/(ind['sy']*s)
-        return eq          
-        
-    def _addVtoNode(self,vs,eq,node):
-        """
-        Add independent voltage source to node equation if it connect to it
-        """ 
-        # Nodes in the voltage source
-        n1 = vs['n1']
-        n2 = vs['n2']
-        # Check if voltage source is connected to n1
-        if n1 == node:
-            eq = eq + vs['isy']
-        # Check if resistor is connected to n2    
-        if n2 == node:
-            eq = eq - vs['isy']
-        return eq 
-
-    def _addItoNode(self,isr,eq,node):
-        """
-        Add independent current source to node equation if it connect to it
-        """ 
-        # Nodes in the current source
-        n1 = isr['n1']
-        n2 = isr['n2']
-        # Check if voltage source is connected to n1
-        if n1 == node:
-            eq = eq + isr['sy']
-        # Check if resistor is connected to n2    
-        if n2 == node:
-            eq = eq - isr['sy']
-        return eq 
+        for node in self.nonZeroNodes:
+            name = 'v'+str(node)
+            ns = sympy.Symbol(name)
+            self.nodeVars[node] = ns
+            self.nodeVarList.append(ns)
+            self.unknowns.add(ns)
+            # Add entry to symbol dictionary
+            self.name[ns] = name
+            # Add to name dictionary
+            self.symbol[name] = ns
+            if verbose:
+                print('    ',name)    
 
-    def _addIMtoNode(self,im,eq,node):
-        """
-        Add current measurement to node equation if it connect to it
-        """ 
-        # Nodes in the current source
-        n1 = im['n1']
-        n2 = im['n2']
-        # Check if voltage source is connected to n1
-        if n1 == node:
-            eq = eq + im['sy']
-        # Check if resistor is connected to n2    
-        if n2 == node:
-            eq = eq - im['sy']
-        return eq         
-       
     def _addKCLequations(self):
         """
         Add the KCL equations
+        Each component adds its current terms only to the equations
+        of its two nodes and each equation is built with a single Add
+        Nodes are accessed by their index in nodeList
         """
         if verbose:
             print('Creating KCL equations')
-        # One equation for each node that is not 0    
-        for node in self.nodeList:
-            if node != 0:
-                equation = sympy.Rational(0,1) 
-                for cm in self.components:
-                    if cm['k'] == 'r':
-                        equation = self._addRtoNode(cm,equation,node)
-                    elif cm['k'] == 'c':
-                        equation = self._addCtoNode(cm,equation,node) 
-                    elif cm['k'] == 'l':
-                        equation = self._addLtoNode(cm,equation,node)                         
-                    elif cm['k'] == 'vs' or cm['k'] == 'cvs':
-                        equation = self._addVtoNode(cm,equation,node) 
-                    elif cm['k'] == 'is' or cm['k'] == 'cis':
-                        equation = self._addItoNode(cm,equation,node)
-                    elif cm['k'] == 'im':
-                        equation = self._addIMtoNode(cm,equation,node)                          
-                # Add to the list of equations        
-                self.equations.append(equation)                
-                if verbose:
-                    print('    ',equation)        
+        # List of terms for each node in nodeList
+        # Terms added to the 0 node are not used
+        terms = [[] for node in self.nodeList]
+        # Current that enters n1 through each R, C and L component
+        kinds = self.kinds
+        nodeVarList = self.nodeVarList
+        for cm in kinds['r'] + kinds['c'] + kinds['l']:
+            term = (nodeVarList[cm.i2] - nodeVarList[cm.i1])*cm.adm
+            terms[cm.i1].append(term)
+            terms[cm.i2].append(-term)
+        # Currents of the sources and current measurements
+        for cm in kinds['vs'] + kinds['cvs'] + kinds['is'] + kinds['cis'] + kinds['im']:
+            if cm.isy is not None:
+                term = cm.isy
+            else:
+                term = cm.sy
+            terms[cm.i1].append(term)
+            terms[cm.i2].append(-term)
+        # Add to the list of equations
+        for i in range(1,len(terms)):
+            equation = sympy.Add(*terms[i])
+            self.equations.append(equation)
+            if verbose:
+                print('    ',equation)
         
     def _substEqs(self,oldS,newS):
         """
-        Substitute one symbol in all equations
+        Queue the substitution of one symbol in all equations
+        Queued substitutions are applied together by _flushSubs
+        with the same result as applying them one after the other
         """
-        newList = []
-        for eq in self.equations:
-            newList.append(eq.subs(oldS,newS))
-        self.equations = newList        
+        for key in self._pendingSubs:
+            value = self._pendingSubs[key]
+            if hasattr(value,'subs'):
+                self._pendingSubs[key] = value.subs(oldS,newS)
+        if oldS not in self._pendingSubs:
+            self._pendingSubs[oldS] = newS
+            
+    def _flushSubs(self):
+        """
+        Apply all queued substitutions to the equations
+        """
+        if self._pendingSubs:
+            subsDic = self._pendingSubs
+            self.equations = [eq.subs(subsDic,simultaneous=True) 
+                              for eq in self.equations]
+            self._pendingSubs = {}
+            
+    def _addEquation(self,eq):
+        """
+        Add one equation after applying the queued substitutions
+        to the previous ones
+        """
+        self._flushSubs()
+        self.equations.append(eq)
     
         
     def _addVequations(self):
@@ -630,31 +642,30 @@ class circuit():
         """    
         if verbose:
             print('Adding V source equations')
-        for cm in self.components:
-            if cm['k']=='vs' or cm['k']=='cvs':
-                # Add current to unknowns
-                self.unknowns.add(cm['isy'])
-                n1 = cm['n1']
-                n2 = cm['n2']
-                if   n1 == 0:
-                    self.equations.append(sympy.Eq(cm['sy'],-self.nodeVars[n2]))
-                elif n2 == 0:
-                    self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n1]))
-                else:
-                    self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n1]-self.nodeVars[n2]))
-                """
-                if   n1 == 0:
-                    self._substEqs(self.nodeVars[n2],cm['sy'])
-                    self.unknowns.remove(self.nodeVars[n2])
-                    self.nodeVars[n2]=cm['sy']
-                elif n2 == 0:    
-                    self._substEqs(self.nodeVars[n1],cm['sy'])
-                    self.unknowns.remove(self.nodeVars[n1])
-                    self.nodeVars[n1]=cm['sy']
-                else:
-                    self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n1]-self.nodeVars[n2])) 
-                """    
-                
+        for cm in self.kinds['vs'] + self.kinds['cvs']:
+            # Add current to unknowns
+            self.unknowns.add(cm.isy)
+            n1 = cm.n1
+            n2 = cm.n2
+            if   n1 == 0:
+                self.equations.append(sympy.Eq(cm.sy,-self.nodeVars[n2]))
+            elif n2 == 0:
+                self.equations.append(sympy.Eq(cm.sy,self.nodeVars[n1]))
+            else:
+                self.equations.append(sympy.Eq(cm.sy,self.nodeVars[n1]-self.nodeVars[n2]))
+            """
+            if   n1 == 0:
+                self._substEqs(self.nodeVars[n2],cm.sy)
+                self.unknowns.remove(self.nodeVars[n2])
+                self.nodeVars[n2]=cm.sy
+            elif n2 == 0:    
+                self._substEqs(self.nodeVars[n1],cm.sy)
+                self.unknowns.remove(self.nodeVars[n1])
+                self.nodeVars[n1]=cm.sy
+            else:
+                self.equations.append(sympy.Eq(cm.sy,self.nodeVars[n1]-self.nodeVars[n2])) 
+            """    
+            
     def _processVM(self):
         """
         Process the voltage measurement components
@@ -663,28 +674,27 @@ class circuit():
         """    
         if verbose:
             print('Adding V measurement equations')
-        for cm in self.components:
-            if cm['k']=='vm':
-                # Add to unknowns
-                self.unknowns.add(cm['sy'])
-                n1 = cm['n1']
-                n2 = cm['n2']
-                if   n1 == 0:
-                    self._substEqs(self.nodeVars[n2],-cm['sy'])
-                    try:
-                        self.unknowns.remove(self.nodeVars[n2])
-                    except KeyError:
-                        # Already removed by voltage source
-                        self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n2]))               
-                elif n2 == 0:    
-                    self._substEqs(self.nodeVars[n1],cm['sy'])
-                    try:
-                        self.unknowns.remove(self.nodeVars[n1])
-                    except KeyError:
-                        # Already removed by voltage source
-                        self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n1]))                
-                else:
-                    self.equations.append(sympy.Eq(cm['sy'],self.nodeVars[n1]-self.nodeVars[n2]))  
+        for cm in self.kinds['vm']:
+            # Add to unknowns
+            self.unknowns.add(cm.sy)
+            n1 = cm.n1
+            n2 = cm.n2
+            if   n1 == 0:
+                self._substEqs(self.nodeVars[n2],-cm.sy)
+                try:
+                    self.unknowns.remove(self.nodeVars[n2])
+                except KeyError:
+                    # Already removed by voltage source
+                    self._addEquation(sympy.Eq(cm.sy,self.nodeVars[n2]))               
+            elif n2 == 0:    
+                self._substEqs(self.nodeVars[n1],cm.sy)
+                try:
+                    self.unknowns.remove(self.nodeVars[n1])
+                except KeyError:
+                    # Already removed by voltage source
+                    self._addEquation(sympy.Eq(cm.sy,self.nodeVars[n1]))                
+            else:
+                self._addEquation(sympy.Eq(cm.sy,self.nodeVars[n1]-self.nodeVars[n2]))  
 
     def _processIM(self):
         """
@@ -694,26 +704,25 @@ class circuit():
         """    
         if verbose:
             print('Adding I measurement equations')
-        for cm in self.components:
-            if cm['k']=='im':
-                # Add to unknowns
-                self.unknowns.add(cm['sy'])
-                n1 = cm['n1']
-                n2 = cm['n2']
-                if n1 == 0:
-                    self._substEqs(self.nodeVars[n2],0)
-                    self.unknowns.remove(self.nodeVars[n2])
-                    self.nodeVars[n2] = 0
-                elif n2 == 0:
-                    self._substEqs(self.nodeVars[n1],0)
-                    self.unknowns.remove(self.nodeVars[n1])
-                    self.nodeVars[n1] = 0
-                else:
-                    self._substEqs(self.nodeVars[n1],self.nodeVars[n2]) 
-                    self.unknowns.remove(self.nodeVars[n1])                    
-                    self.nodeVars[n1] = self.nodeVars[n2]
-                    
-                #self.equations.append(sympy.Eq(self.nodeVars[n1],self.nodeVars[n2]))          
+        for cm in self.kinds['im']:
+            # Add to unknowns
+            self.unknowns.add(cm.sy)
+            n1 = cm.n1
+            n2 = cm.n2
+            if n1 == 0:
+                self._substEqs(self.nodeVars[n2],0)
+                self.unknowns.remove(self.nodeVars[n2])
+                self.nodeVars[n2] = 0
+            elif n2 == 0:
+                self._substEqs(self.nodeVars[n1],0)
+                self.unknowns.remove(self.nodeVars[n1])
+                self.nodeVars[n1] = 0
+            else:
+                self._substEqs(self.nodeVars[n1],self.nodeVars[n2]) 
+                self.unknowns.remove(self.nodeVars[n1])                    
+                self.nodeVars[n1] = self.nodeVars[n2]
+                
+            #self.equations.append(sympy.Eq(self.nodeVars[n1],self.nodeVars[n2]))          
            
     def _processCtr(self):
         """
@@ -721,9 +730,8 @@ class circuit():
         """    
         if verbose:
             print('Processing controlled elements')
-        for cm in self.components:        
-            if cm['k'] == 'cvs' or cm['k'] == 'cis':
-                self._substEqs(cm['sy'],cm['sy']*cm['ctr']['sy'])     
+        for cm in self.kinds['cvs'] + self.kinds['cis']:
+            self._substEqs(cm.sy,cm.sy*cm.ctr.sy)     
 
             
     def _showEquations(self):
@@ -737,10 +745,20 @@ class circuit():
     def _solveEquations(self):
         """
         Solve the circuit equations
+        Uses SymEngine if available and SymPy if not
         """
         if verbose:
             print('Unknowns:',self.unknowns)
-        self.sSolution = sympy.solve(self.equations,list(self.unknowns))
+        # Sorted unknowns give the same equations order on all runs
+        unknowns = sorted(self.unknowns,key=str)
+        if symengineFound:
+            try:
+                self.sSolution = _solveSymengine(self.equations,unknowns)
+                return
+            except (RuntimeError,TypeError,ValueError):
+                if verbose:
+                    print('SymEngine could not solve the equations, using SymPy')
+        self.sSolution = sympy.solve(self.equations,unknowns)
             
     def _nameSolution(self):
         """
@@ -770,13 +788,20 @@ class circuit():
     def solve(self):
         """
         Solve a circuit
+        If the circuit has not changed since the last call
+        only the component values are substituted again
         """
+        if self.solved:
+            self._substituteSolution()
+            return self.solution
         if verbose:
             print('Solving the circuit')
         # Initialize equation list    
         self.equations  = []
         # Initialize unknowns set
         self.unknowns = set([])
+        # Initialize queued substitutions
+        self._pendingSubs = {}
         # Generate a list of nodes in nodeList
         self._numNodes()
         # Create node variables in dict nodeVars
@@ -793,6 +818,8 @@ class circuit():
         self._processVM()
         # Process controlled voltage sources
         self._processCtr()
+        # Apply the substitutions of the previous steps
+        self._flushSubs()
         # Show the circuit equations
         if verbose:
             self._showEquations()
@@ -800,35 +827,150 @@ class circuit():
         self._solveEquations()
         # Generate solution with names instead of symbols
         self._nameSolution()
+        self.solved = True
+        self.paramFunc = None
         # Substitute values in the solution
         self._substituteSolution()
         return self.solution
         
-    def subs(self):
+    def subs(self,values=None):
         """
         Give solution after substituting component values
+        Optional parameter:
+           values : Dictionary of values with symbol keys
+                    that are used instead of the component values
+                    The circuit is not modified
         """  
-        return self.particular       
+        if values is None:
+            return self.particular
+        subsDic = dict(self.subsDic)
+        subsDic.update(values)
+        result = {}
+        for key in self.solution:
+            result[key] = self.solution[key].subs(subsDic)
+        return result
+        
+    def _buildParamFunction(self):
+        """
+        Compile the solution to a NumPy function
+        Its arguments are all the symbols in the solution sorted by name
+        """
+        keys = sorted(self.solution)
+        exprs = [sympy.sympify(self.solution[key]).evalf() for key in keys]
+        syms = set([])
+        for expr in exprs:
+            syms.update(expr.free_symbols)
+        syms = sorted(syms,key=str)
+        self.paramFunc = (keys,syms,_lambdify(syms,exprs))
+        
+    def evalParams(self,**values):
+        """
+        Evaluate the solution numerically
+        The solution is compiled to a NumPy function on the first call
+        Parameters are given by name and can be NumPy arrays for sweeps
+        Symbols not given use their value in the substitution dictionary
+        Raises circuitEx if a name is not a symbol of the solution
+        Return a dictionary with the value of each solution name
+        All values have the broadcast shape of the parameters,
+        also the ones that don't depend on them
+        """
+        if not self.solved:
+            self.solve()
+        if self.paramFunc is None:
+            self._buildParamFunction()
+        keys,syms,f = self.paramFunc
+        names = set(str(sy) for sy in syms)
+        for name in values:
+            if name not in names:
+                raise circuitEx('Unknown parameter ' + name)
+        args = []
+        for sy in syms:
+            name = str(sy)
+            if name in values:
+                args.append(values[name])
+            elif sy in self.subsDic:
+                args.append(self.subsDic[sy])
+            else:
+                raise circuitEx('No value for ' + name)
+        # Shape of the parameters
+        shape = np.broadcast(*[np.asarray(arg) for arg in args]+[np.asarray(0)]).shape
+        result = {}
+        for key,value in zip(keys,f(*args)):
+            if np.shape(value) != shape:
+                value = np.array(np.broadcast_to(value,shape))
+            result[key] = value
+        return result       
 
 # HELPER FUNCTIONS #############################################################################
 
+def _solveSymengine(equations,unknowns):
+    """
+    Solve the linear circuit equations with SymEngine
+    Equations can be expressions equal to zero or sympy.Eq objects
+    Returns a dictionary with the SymPy solution for each unknown
+    """
+    exprs = []
+    for eq in equations:
+        if isinstance(eq,sympy.Equality):
+            eq = eq.lhs - eq.rhs
+        exprs.append(symengine.sympify(eq))
+    values = symengine.linsolve(exprs,[symengine.sympify(u) for u in unknowns])
+    return dict((u,sympy.sympify(v)) for u,v in zip(unknowns,values))
+
 def expr2func(expr,*vars):
     """
     Convert an expression to a function
     """
-    return sympy.lambdify(vars,expr)
+    return _lambdify(vars,expr)
+    
+def _lambdify(vars,expr):
+    """
+    Lambdify an expression for NumPy
+    Common subexpressions are only computed once
+    SymPy versions without the cse option use plain lambdify
+    """
+    try:
+        return sympy.lambdify(vars,expr,'numpy',cse=True)
+    except TypeError:
+        return sympy.lambdify(vars,expr,'numpy')
+
+# Functions compiled with Numba by evalList
+# Keys are (expression,variable) tuples
+# Value is None if the expression could not be compiled
+_numbaCache = {}
 
-def evalList(expr,var,set):
+def evalList(expr,var,set,backend='numpy'):
     """
     Evaluate a sympy expression in a set of values
+    The expression is compiled once to a NumPy function
+    Constant subexpressions are evaluated before compiling it
+    Optional parameter:
+       backend : 'numpy' (default) or 'numba'
+                 'numba' compiles the function with Numba and keeps it
+                 for the next calls with the same expression
+                 If Numba is not available or cannot compile it
+                 the NumPy function is used
     """
+    expr = sympy.sympify(expr).evalf()
+    x = np.asarray(set)
+    if backend == 'numba' and numbaFound:
+        key = (expr,var)
+        if key not in _numbaCache:
+            _numbaCache[key] = numba.njit(expr2func(expr,var))
+        f = _numbaCache[key]
+        if f is not None:
+            try:
+                return np.array(f(x))
+            except NumbaError:
+                _numbaCache[key] = None
     f = expr2func(expr,var)
-    return np.array(f(np.array(set)))
+    return np.array(f(x))
     #return np.array([complex((expr.subs(var,x)).evalf()) for x in set])
     
-def evalFreqs(expr,set):    
+def evalFreqs(expr,set,backend='numpy'):    
     """
     Evaluate a sympy expression in a set of frequencies (Hz) for 's' symbols
+    Backend is 'numpy' or 'numba' as in evalList
     """
-    return evalList(expr,s,1j*2.0*np.pi*set)
+    return evalList(expr,s,1j*2.0*np.pi*np.asarray(set),backend)
     
\ No newline at end of file
@@ -10,7 +10,47 @@ History:
   10/03/2018 : Improvement of doMontecarlo
                sq() now is not member but external function
                Added exp() log() ipow(b,e) sin() cos()
-   13/3/2018 : Added version string            
+   13/3/2018 : Added version string
+  15/10/2026 : doMontecarlo draws all cases at once
+               Added doMontecarloVec for functions that operate with arrays
+               montecarlo() takes random numbers from pregenerated buffers
+               Interval limits of *, / and sq() use kernels compiled with Numba
+               if available and the limits are floats
+               Product and quotient limits select the corners by sign
+               Variables can also be tracked as affine forms to avoid widening
+               the limits of correlated operations (useAffine)
+               Constant mode values are cached and operations with numbers
+               return directly a number
+               Limits are reduced with a single max() and min() call
+               mmVar uses __slots__
+               Results are built with _fast() skipping the constructor checks
+               cumulative() uses np.arange
+               Binary operators check the operand class with "is"
+               Comparisons with None use "is"
+               Added doMontecarloJit
+               The sign class of each variable is cached
+               max, min and typ are stored in a single tuple
+               Added has_typ flag
+               Bulk helper functions use method callers
+               Random numbers use the NumPy default_rng generator
+               Added montecarloArray(n,*args)
+               Removed the _monteCompare sort helper
+               prob() uses np.searchsorted
+               ipow() limits use a compiled kernel
+               sin() and cos() use math.ceil() and math.floor()
+               sqrt(), exp() and log() use the math module
+               ipow() uses the ** operator
+               Added mmVarArray class
+               Quotient limits select the corners by sign
+               get_values() checks the class with "is"
+               __eq__ returns NotImplemented if other is not mmVar
+               Undefined typical values are stored as NaN
+               Added mmLazy class for deferred expressions
+               _get_values() skips the usage check for not unique variables
+               Added seed()
+               Montecarlo range, midpoint and sigma are calculated only once
+               Added mmLazy evaluateIv() and evaluateTuned() using mpmath if available
+               Products and quotients of point values skip the limit calculation
 '''
 # Python 2.7 compatibility
 from __future__ import print_function
@@ -18,7 +58,46 @@ from __future__ import division
 
 import random
 import numpy as np
-import functools
+import itertools
+import math
+import operator
+from operator import methodcaller
+
+# Numba is optional
+# If it is not available the pure Python kernels are used
+try:
+    import numba
+    from numba import prange
+    numbaFound = True
+except ImportError:
+    numbaFound = False
+
+# Decorator that compiles with Numba when it is available
+if numbaFound:
+    _jit = numba.njit(cache=True)
+else:
+    def _jit(f):
+        return f
+
+# mpmath is optional
+# It is only used to evaluate mmLazy expressions with more precision
+try:
+    import mpmath
+    mpmathFound = True
+except ImportError:
+    mpmathFound = False
+
+# Random number generator
+# Uses the PCG64 Generator if NumPy has it (NumPy 1.17 or newer)
+try:
+    _rng = np.random.default_rng()
+    _rngUniform = _rng.random
+except AttributeError:
+    _rng = np.random
+    _rngUniform = _rng.random_sample
+
+# Undefined typical values are stored as NaN
+_NAN = float('nan')
 
 # Version string
 version = '12/03/2018'
@@ -35,6 +114,72 @@ class mmEx(Exception):
     def __str__(self):
         return repr(self.code)
 
+# Interval kernels ################################################
+# They return the (max,min) limits of the operation
+
+def _mul_interval(ma1,mi1,ma2,mi2):
+    # Limits of a product
+    # The sign of each operand selects the corners so that
+    # all four products are only needed if both ranges include zero
+    if mi1 >= 0:
+        if mi2 >= 0:
+            return ma1*ma2,mi1*mi2
+        if ma2 <= 0:
+            return mi1*ma2,ma1*mi2
+        return ma1*ma2,ma1*mi2
+    if ma1 <= 0:
+        if mi2 >= 0:
+            return ma1*mi2,mi1*ma2
+        if ma2 <= 0:
+            return mi1*mi2,ma1*ma2
+        return mi1*mi2,mi1*ma2
+    if mi2 >= 0:
+        return ma1*ma2,mi1*ma2
+    if ma2 <= 0:
+        return mi1*mi2,ma1*mi2
+    # Both ranges include zero
+    return max(ma1*ma2,mi1*mi2),min(ma1*mi2,mi1*ma2)
+    
+def _sq_interval(ma1,mi1):
+    # Limits of a square
+    v1 = ma1*ma1
+    v2 = mi1*mi1
+    if mi1 < 0 < ma1:
+        return max(v1,v2),0*v1
+    return max(v1,v2),min(v1,v2)
+    
+def _ipow_interval(ma1,mi1,exp):
+    # Limits of a positive integer power
+    v1 = ma1**exp
+    v2 = mi1**exp
+    if exp % 2 == 0 and mi1 < 0 < ma1:
+        return max(v1,v2),0*v1
+    return max(v1,v2),min(v1,v2)
+    
+def _div_interval(ma1,mi1,ma2,mi2):
+    # Limits of a quotient
+    # The divisor range must not include zero
+    # The sign of each operand selects the corners
+    if mi2 > 0:
+        if mi1 >= 0:
+            return ma1/mi2,mi1/ma2
+        if ma1 <= 0:
+            return ma1/ma2,mi1/mi2
+        return ma1/mi2,mi1/mi2
+    if mi1 >= 0:
+        return mi1/mi2,ma1/ma2
+    if ma1 <= 0:
+        return mi1/ma2,ma1/mi2
+    return mi1/ma2,ma1/ma2
+    
+# Compiled kernels
+# They are compiled on first use and only called with float limits
+# so that other number types, like int or Fraction, keep the
+# Python arithmetic
+_mul_intervalJit = _jit(_mul_interval)
+_sq_intervalJit = _jit(_sq_interval)
+_ipow_intervalJit = _jit(_ipow_interval)
+  
 '''
 mmVar Class definition
  
@@ -49,27 +194,69 @@ Additional parameters:
 mmVar objects can operate in two modes:   
 Base mode: Max and Min values are propagated
               A variable can only be used one time if individual is set
+              If useAffine is True affine forms are also propagated so that
+              operations with correlated operands, like x-x, don't widen the limits
 Constant mode: Only val property is propagated
                val is set in special methods
                   .setTypical()    sets val = typ
                   .montecarlo() sets val to random within range
 '''
  
-class mmVar:
+class mmVar(object):
+    # Fixed member data
+    __slots__ = ('val','_cv','unique','used','ns','_mm','has_typ','_mc',
+                 'center','noise','_sign')
+    
+    # RANDOM BUFFERS ################################
+    
+    # Random numbers are generated in blocks and shared by all objects
+    _RNG_SIZE = 65536   # Size of the buffers
+    _rng_buf  = None    # Uniform [0,1) buffer
+    _rng_idx  = 0       # Next element in uniform buffer
+    _nrm_buf  = None    # Standard normal buffer
+    _nrm_idx  = 0       # Next element in normal buffer
+    
+    @staticmethod
+    def _uniform():
+        # Get next uniform random number in [0,1)
+        if mmVar._rng_buf is None or mmVar._rng_idx >= len(mmVar._rng_buf):
+            mmVar._rng_buf = _rngUniform(mmVar._RNG_SIZE)
+            mmVar._rng_idx = 0
+        r = mmVar._rng_buf[mmVar._rng_idx]
+        mmVar._rng_idx += 1
+        return r
+        
+    @staticmethod
+    def _normal():
+        # Get next standard normal random number
+        if mmVar._nrm_buf is None or mmVar._nrm_idx >= len(mmVar._nrm_buf):
+            mmVar._nrm_buf = _rng.standard_normal(mmVar._RNG_SIZE)
+            mmVar._nrm_idx = 0
+        r = mmVar._nrm_buf[mmVar._nrm_idx]
+        mmVar._nrm_idx += 1
+        return r
+    
     # CONSTRUCTOR ###################################
     
     def __init__(self,a,b=None,typ=None,tol=None,s=None,ns=0):
         # State memeber data
         self.val=None       # Current value of variable
+        self._cv=None       # Cached (val,val,val) tuple for constant mode
+        self._sign=None     # Cached sign class of the range
+        self._mm=(None,None,None)  # (max,min,typ) triplet
+        self._mc=None       # Cached montecarlo parameters
+        self.has_typ=False  # True if typ is defined
         self.unique=False   # Unique variable can only be used once
         self.used=False     # Variable already used if unique
         self.ns=ns          # Number of sigmas if normal
-        self.typ=None       # Default self.typ
+        self.typ=_NAN       # Default self.typ (undefined)
+        self.center=None    # Affine form central value
+        self.noise=None     # Affine form noise symbols {id:coefficient}
         
         # max, min, typ member data
-        if b == None:
+        if b is None:
             # If b value is not given
-            if tol != None:
+            if tol is not None:
                 # Tolerance is given
                      
                 a1 = a*(1.0+tol)
@@ -77,20 +264,20 @@ class mmVar:
                 self.max=max(a1,a2)
                 self.min=min(a1,a2)
                 
-                if self.typ == None:  # typ is not given
+                if not self.has_typ:  # typ is not given
                     self.typ = a
                 else:                 # typ is given
                     if typ < self.min or typ > self.max:
                         raise mmEx("Typical value out of bounds")    
                     self.typ=typ
                 
-                if s != None and ns == 0:
+                if s is not None and ns == 0:
                     # s is given but ns is not
                     ns = (self.max - self.min)/(2.0*s)
                     self.ns = ns
                 return   
            
-            if s != None:
+            if s is not None:
                 # If s value is given but tolerance is not given
                                    
                 if ns == 0:
@@ -100,7 +287,7 @@ class mmVar:
                 self.max=a+self.ns*s
                 self.min=a-self.ns*s   
                 
-                if self.typ == None:  # typ is not given
+                if not self.has_typ:  # typ is not given
                     self.typ = a
                 else:                 # typ is given
                     if typ < self.min or typ > self.max:
@@ -108,7 +295,7 @@ class mmVar:
                     self.typ=typ
                 return
                 
-            if tol == None:
+            if tol is None:
                 # No tolerance nor s is given
                 self.max = a
                 self.min = a
@@ -117,13 +304,13 @@ class mmVar:
                 return                
         else:     
             # b value is given
-            if tol != None:
+            if tol is not None:
                 raise mmEx("Ilegal use of tol argument")
             self.max=max(a,b)
             self.min=min(a,b)
             # Check is typical is between min and max
-            if typ == None:
-                if ns != 0 or s!= None:
+            if typ is None:
+                if ns != 0 or s is not None:
                     # In normal distribution
                     self.typ = (self.max+self.min)/2.0
             else: 
@@ -131,16 +318,81 @@ class mmVar:
                     raise mmEx("Typical value out of bounds")    
                 self.typ=typ         
             # Recalculate ns if needed
-            if s != None and ns == None:
+            if s is not None and ns is None:
                 ns = (self.max-self.min)/(2.0*s)
 
+    @classmethod
+    def _fast(cls,ma,mi,ty,center=None,noise=None):
+        # Internal use
+        # Build a result variable with already checked ma >= mi
+        # without the constructor argument processing
+        # ty is NaN if the typical value is not defined
+        o = cls.__new__(cls)
+        o.val = None
+        o._cv = None
+        o.unique = False
+        o.used = False
+        o.ns = 0
+        o._mm = (ma,mi,ty)
+        o.has_typ = ty == ty
+        o.center = center
+        o.noise = noise
+        o._sign = None
+        o._mc = None
+        return o
+
+    # LIMITS ############################################
+    # max, min and typ are stored together in the _mm tuple
+    # that is returned as is in _get_values
+
+    @property
+    def max(self):
+        return self._mm[0]
+        
+    @max.setter
+    def max(self,value):
+        self._mm = (value,self._mm[1],self._mm[2])
+        self._limitsChanged()
+        
+    @property
+    def min(self):
+        return self._mm[1]
+        
+    @min.setter
+    def min(self,value):
+        self._mm = (self._mm[0],value,self._mm[2])
+        self._limitsChanged()
+        
+    @property
+    def typ(self):
+        # None if the typical value is not defined
+        if not self.has_typ:
+            return None
+        return self._mm[2]
+        
+    @typ.setter
+    def typ(self,value):
+        # None is stored as NaN
+        if value is None:
+            value = _NAN
+        self._mm = (self._mm[0],self._mm[1],value)
+        self.has_typ = value == value
+
     # INTERNAL METHODS ###################################
     
+    def _limitsChanged(self):
+        # Internal use
+        # Clear the values calculated from the limits
+        self._mc = None
+        self._sign = None
+        self.center = None
+        self.noise = None
+    
     def _n_mode(self):
         # Internal use
         # Indicates if we are operating in normal mode
         # and checks the double usage
-        if self.val==None:
+        if self.val is None:
             # Normal mode
             if self.used:
                 raise mmEx('Variable used two times')
@@ -152,21 +404,60 @@ class mmVar:
             # Constant value mode
             return False
           
+    def _affine(self):
+        # Internal use
+        # Get current affine form as (center,noise)
+        # Base variables get one new noise symbol the first time
+        if self.val is not None:
+            return self.val,{}
+        if self.noise is None:
+            self.center = (self.max+self.min)/2
+            if self.max == self.min:
+                self.noise = {}
+            else:
+                self.noise = {next(_noiseId):(self.max-self.min)/2}
+        return self.center,self.noise
+          
+    def _sign_class(self):
+        # Internal use
+        # Sign of the range: 1 if min >= 0, -1 if max <= 0
+        # and 0 if the range includes zero
+        # It is cached until the limits are changed
+        if self._sign is None:
+            if self.min >= 0:
+                self._sign = 1
+            elif self.max <= 0:
+                self._sign = -1
+            else:
+                self._sign = 0
+        return self._sign
+          
+    def _setVal(self,value):
+        # Internal use
+        # Set constant mode value
+        self.val = value
+        self._cv = (value,value,value)
+        return value
+          
     def _get_values(self):
         # Internal use
         # Get current values
-        if self._n_mode():
-            return self.max,self.min,self.typ
-        else:
-            return self.val,self.val,self.val
+        if self.val is not None:
+            return self._cv
+        # Only unique variables need the double usage check
+        # Operation results are never unique
+        if not self.unique:
+            return self._mm
+        self._n_mode()
+        return self._mm
           
     def __str__(self):
         # String that represents the value (max:typ:min)
-        if self.val != None:
+        if self.val is not None:
             return str(self.val)
         if self.max == self.min:
             return str(self.max)
-        if self.typ == None:
+        if not self.has_typ:
             return '('+str(self.max)+'::'+str(self.min)+')'  
         else:  
             return '('+str(self.max)+':'+str(self.typ)+':'+str(self.min)+')'
@@ -176,16 +467,20 @@ class mmVar:
     def __add__(self,other):
         # Adds two values (other can be mmVar or number) '+'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return self.val+other
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
         # Get other values
-        if isinstance(other,mmVar):
+        if other.__class__ is mmVar:
             ma2,mi2,ty2=other._get_values()
+        elif other.__class__ is mmVarArray or other.__class__ is mmLazy:
+            return NotImplemented
         else:
-            ma2=other
-            mi2=other
-            ty2=other
+            ma2=mi2=ty2=other
             
         # Calculate limits    
         ma1=ma1+ma2
@@ -193,21 +488,26 @@ class mmVar:
             
         # Check if limits are equal
         if ma1 == mi1:
-            return ty1            
+            return ma1            
             
-        # Check typical for none    
-        if ty1 == None or ty2 == None:
-            ty1 = None
-        else:
-            ty1 = ty1 + ty2    
+        # Typical value (NaN if not defined)
+        ty1 = ty1 + ty2
             
         # Return new variable
-        mm = mmVar(ma1,mi1,ty1)
-        return mm
+        if not useAffine:
+            return mmVar._fast(ma1,mi1,ty1)
+        c1,n1 = self._affine()
+        c2,n2 = _get_affine(other)
+        c3,n3 = _affine_lin(c1,n1,c2,n2,1)
+        return _affine_result(ma1,mi1,ty1,c3,n3)
           
     def __radd__(self,other):
         # Implements other+self when other is not mmVar '+'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return other+self.val
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
@@ -219,18 +519,22 @@ class mmVar:
         if ma2 == mi2:
             return ma1
         
-        # Check self typical for none
-        if self.typ == None:
-            ty2 = None
-        else:
-            ty2 = other+self.typ
+        # Typical value (NaN if not defined)
+        ty2 = other+self._mm[2]
         
         # Return new variable
-        mm = mmVar(ma2,mi2,ty2)
-        return mm          
+        if not useAffine:
+            return mmVar._fast(ma2,mi2,ty2)
+        c1,n1 = self._affine()
+        c2,n2 = _affine_lin(other,{},c1,n1,1)
+        return _affine_result(ma2,mi2,ty2,c2,n2)
           
     def __neg__(self):
         # Changes sign
+        # Constant mode
+        if self.val is not None:
+            return -self.val
+        
         ma1,mi1,ty1 = self._get_values()
         
         # New limits
@@ -241,27 +545,33 @@ class mmVar:
         if ma1 == mi1:
             return ma1
 
-        # Check typical value  
-        if ty1 != None:
-            ty1 = -ty1
+        # Typical value (NaN if not defined)
+        ty1 = -ty1
         
         # Return new variable
-        mm = mmVar(ma1,mi1,ty1)
-        return mm 
+        if not useAffine:
+            return mmVar._fast(mi1,ma1,ty1)
+        c1,n1 = self._affine()
+        c2,n2 = _affine_scale(c1,n1,-1)
+        return _affine_result(ma1,mi1,ty1,c2,n2)
                   
     def __sub__(self,other):
         # Substracts two values (other can be mmVar or number) '-'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return self.val-other
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
         # Get other instance values
-        if isinstance(other,mmVar):
+        if other.__class__ is mmVar:
             ma2,mi2,ty2=other._get_values()
+        elif other.__class__ is mmVarArray or other.__class__ is mmLazy:
+            return NotImplemented
         else:
-            ma2=other
-            mi2=other
-            ty2=other
+            ma2=mi2=ty2=other
             
         # New limits   
         ma1=ma1-mi2
@@ -271,19 +581,24 @@ class mmVar:
         if ma1 == mi1:
             return ma1
         
-        # Check typical for none    
-        if ty1 == None or ty2 == None:
-            ty1 = None
-        else:
-            ty1 = ty1 - ty2    
+        # Typical value (NaN if not defined)
+        ty1 = ty1 - ty2
         
         # Return new variable
-        mm = mmVar(ma1,mi1,ty1)
-        return mm          
+        if not useAffine:
+            return mmVar._fast(ma1,mi1,ty1)
+        c1,n1 = self._affine()
+        c2,n2 = _get_affine(other)
+        c3,n3 = _affine_lin(c1,n1,c2,n2,-1)
+        return _affine_result(ma1,mi1,ty1,c3,n3)
           
     def __rsub__(self,other):
         # Implements other-self when other is not mmVar '-'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return other-self.val
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
@@ -295,89 +610,92 @@ class mmVar:
         if ma2 == mi2:
             return ma2
           
-        # Check self typical forn none
-        if self.typ == None:
-            ty2 = None
-        else:
-            ty2 = other-self.typ
+        # Typical value (NaN if not defined)
+        ty2 = other-self._mm[2]
             
         # Return new variable
-        mm = mmVar(ma2,mi2,ty2)
-        return mm
+        if not useAffine:
+            return mmVar._fast(ma2,mi2,ty2)
+        c1,n1 = self._affine()
+        c2,n2 = _affine_lin(other,{},c1,n1,-1)
+        return _affine_result(ma2,mi2,ty2,c2,n2)
         
     def __mul__(self,other):
         # Multiplies two values (other can be mmVar or number) '*'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return self.val*other
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
         # Get other valus
-        if isinstance(other,mmVar):
+        if other.__class__ is mmVar:
             ma2,mi2,ty2=other._get_values()
+        elif other.__class__ is mmVarArray or other.__class__ is mmLazy:
+            return NotImplemented
         else:
-            ma2=other
-            mi2=other
-            ty2=other
+            ma2=mi2=ty2=other
+            
+        # Point values give a number
+        if ma1 == mi1 and ma2 == mi2:
+            return ma1*ma2
             
         # Calculate limits    
-        v=ma1*ma2  
-        ma3=v
-        mi3=v
-        
-        v=ma1*mi2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
-        
-        v=mi1*ma2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
-        
-        v=mi1*mi2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v) 
+        if (numbaFound and ma1.__class__ is float and mi1.__class__ is float
+                and ma2.__class__ is float and mi2.__class__ is float):
+            ma3,mi3 = _mul_intervalJit(ma1,mi1,ma2,mi2)
+        else:
+            ma3,mi3 = _mul_interval(ma1,mi1,ma2,mi2)
         
         # Check if limits are equal
         if ma3 == mi3:
             return ma3
           
-        # Check typical for none
-        if ty1 == None or ty2 == None:
-            ty3 = None
-        else:
-            ty3 = ty1 * ty2
+        # Typical value (NaN if not defined)
+        ty3 = ty1 * ty2
         
         # Return new variable
-        mm = mmVar(ma3,mi3,ty3)
-        return mm  
+        if not useAffine:
+            return mmVar._fast(ma3,mi3,ty3)
+        c1,n1 = self._affine()
+        c2,n2 = _get_affine(other)
+        c3,n3 = _affine_mul(c1,n1,c2,n2)
+        return _affine_result(ma3,mi3,ty3,c3,n3)
       
     def __rmul__(self,other):
         # Implements other*self when other is not mmVar '*'
         
+        # Constant mode with a number
+        if self.val is not None and isinstance(other,(int,float)):
+            return other*self.val
+        
         # Get self values
         ma1,mi1,ty1 = self._get_values()
         
-        # Calculate limits    
-        v=other*ma1  
-        ma3=v
-        mi3=v
+        # Point value gives a number
+        if ma1 == mi1:
+            return other*ma1
         
-        v=other*mi1
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
+        # Calculate limits    
+        vs=(other*ma1,other*mi1)
+        ma3=max(vs)
+        mi3=min(vs)
         
         # Check if limits are equal    
         if ma3 == mi3:
             return ma3
         
-        # Check self typical for none
-        if self.typ == None:
-            ty3 = None
-        else:
-            ty3 = other*self.typ
+        # Typical value (NaN if not defined)
+        ty3 = other*self._mm[2]
         
         # Return new variable
-        mm = mmVar(ma3,mi3,ty3)
-        return mm
+        if not useAffine:
+            return mmVar._fast(ma3,mi3,ty3)
+        c1,n1 = self._affine()
+        c3,n3 = _affine_scale(c1,n1,other)
+        return _affine_result(ma3,mi3,ty3,c3,n3)
       
     def __truediv__(self,other):
         # Divides two values (other can be mmVar or number) '/'
@@ -386,86 +704,86 @@ class mmVar:
         ma1,mi1,ty1 = self._get_values()
         
         # Get other values
-        if isinstance(other,mmVar):
+        if other.__class__ is mmVar:
             ma2,mi2,ty2=other._get_values()
+        elif other.__class__ is mmVarArray or other.__class__ is mmLazy:
+            return NotImplemented
         else:
-            ma2=other
-            mi2=other
-            ty2=other
+            ma2=mi2=ty2=other
             
         # Check for zero division
-        if ma2>0 and mi2<0:
+        if mi2 <= 0 <= ma2:
             raise mmEx('Quotient range includes zero')
             
-        # Calculate limits
-        v=ma1/ma2  
-        ma3=v
-        mi3=v
-        
-        v=ma1/mi2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
-        
-        v=mi1/ma2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
-        
-        v=mi1/mi2
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)  
+        # Point values give a number
+        if ma1 == mi1 and ma2 == mi2:
+            return ma1/ma2
+            
+        # Calculate limits    
+        ma3,mi3 = _div_interval(ma1,mi1,ma2,mi2)
         
         # Check if limits are equal    
         if ma3 == mi3:
             return ma3
         
-        # Check typical for none
-        if ty1 == None or ty2 == None:
-            ty3 = None
-        else:
-            ty3 = ty1 / ty2
+        # Typical value (NaN if not defined)
+        ty3 = ty1 / ty2
         
         # Return new variable
-        mm = mmVar(ma3,mi3,ty3)
-        return mm                
+        if not useAffine:
+            return mmVar._fast(ma3,mi3,ty3)
+        c1,n1 = self._affine()
+        c2,n2 = _get_affine(other)
+        inv = _affine_inv(c2,n2)
+        if inv is None:
+            return mmVar._fast(ma3,mi3,ty3)
+        c3,n3 = _affine_mul(c1,n1,inv[0],inv[1])
+        return _affine_result(ma3,mi3,ty3,c3,n3)
         
     def __rtruediv__(self,other):
         # Implements other/self when other is not mmVar '/'
         
+        # Get self values
+        ma1,mi1,ty1 = self._get_values()
+        
         # Check for zero division
-        if self.max>0 and self.min<0:
+        if mi1 <= 0 <= ma1:
             raise mmEx('Quotient range includes zero')
         
-        # Get self values
-        ma1,mi1,ty1 = self._get_values()
+        # Point value gives a number
+        if ma1 == mi1:
+            return other/ma1
         
         # Calculate limits    
-        v=other/ma1  
-        ma3=v
-        mi3=v
-        
-        v=other/mi1
-        ma3=max(ma3,v)
-        mi3=min(mi3,v)
+        vs=(other/ma1,other/mi1)
+        ma3=max(vs)
+        mi3=min(vs)
         
         # Check if limits are equal    
         if ma3 == mi3:
             return ma3
         
-        # Check self typical for none
-        if self.typ == None:
-            ty3 = None
-        else:
-            ty3 = other/self.typ
+        # Typical value (NaN if not defined)
+        ty3 = other/self._mm[2]
         
         # Return new variable
-        mm = mmVar(ma3,mi3,ty3)
-        return mm
+        if not useAffine:
+            return mmVar._fast(ma3,mi3,ty3)
+        c1,n1 = self._affine()
+        inv = _affine_inv(c1,n1)
+        if inv is None:
+            return mmVar._fast(ma3,mi3,ty3)
+        c3,n3 = _affine_scale(inv[0],inv[1],other)
+        return _affine_result(ma3,mi3,ty3,c3,n3)
         
     # RELATIONAL OPERATORS #################################  
     
     def __eq__(self,other):
         # Check for equity '=='
-        # ToDo : Consider if other is not mmVar
+        
+        # Only defined between mmVar objects
+        if other.__class__ is not mmVar:
+            return NotImplemented
         
         # Get self values
         ma1,mi1,ty1 = self._get_values()
@@ -474,7 +792,8 @@ class mmVar:
         ma2,mi2,ty2 = other._get_values()
         
         # Check for equity
-        if ma1 == ma2 and mi1 == mi2 and ty1 == ty2:
+        # Two undefined typical values (NaN) are equal
+        if ma1 == ma2 and mi1 == mi2 and (ty1 == ty2 or (ty1 != ty1 and ty2 != ty2)):
             return True
         else:
             return False
@@ -491,6 +810,7 @@ class mmVar:
       
     def typical(self):
         # Return the typical value
+        # or None if it is not defined
         return self.typ
          
     # FROZEN VALUE ##########################################    
@@ -498,23 +818,45 @@ class mmVar:
     def setTypical(self):
         # Set value to typical one 
         # Object won't be aleatory anymore
-        if self.typ == None:
+        if not self.has_typ:
             raise mmEx('Undefined typical value')
-        self.val=self.typ
-        return self.val
+        return self._setVal(self.typ)
+            
+    def _mcParams(self):
+        # Internal use
+        # Get (min,range,midpoint,sigma) for montecarlo calculations
+        # They are cached until the limits are changed
+        if self._mc is None:
+            range = self.max - self.min
+            midpoint = (self.max+self.min)/2
+            if self.ns == 0:
+                sigma = 0.0
+            else:
+                sigma = range/(2*self.ns)
+            self._mc = (self.min,range,midpoint,sigma)
+        return self._mc
             
     def montecarlo(self):
         # Set value unifor random between bounds
-        range = self.max - self.min
-        midpoint = (self.max+self.min)/2
+        mi,range,midpoint,sigma = self._mc or self._mcParams()
+        if self.ns == 0:
+            #Uniform distribution 
+            return self._setVal(mi + range*mmVar._uniform())
+        else:
+            #Normal distribution
+            return self._setVal(midpoint + sigma*mmVar._normal())
+      
+    def montecarloArray(self,n):
+        # Return an array of n random values between bounds
+        # with the same distribution used in montecarlo()
+        # The object value is not modified
+        mi,range,midpoint,sigma = self._mc or self._mcParams()
         if self.ns == 0:
             #Uniform distribution 
-            self.val = self.min + range*np.random.rand()
+            return mi + range*_rngUniform(n)
         else:
             #Normal distribution
-            sigma = range/(2*self.ns)            
-            self.val = np.random.normal(midpoint,sigma)
-        return self.val
+            return _rng.normal(midpoint,sigma,n)
       
     # VARIABLE VALUE ########################################  
       
@@ -534,12 +876,189 @@ class mmVar:
         self.used=False
         self.unique=False
 
+'''
+mmVarArray Class definition
+
+Holds the limits of several variables as a structure of arrays
+so that operations are calculated for all of them in NumPy
+
+Constructors
+   mmVarArray(max,min)      Arrays of maximum and minimum values
+   mmVarArray(max,min,typ)  Also gives the array of typical values
+   mmVarArray.fromList(l)   From a list of mmVar objects or numbers
+   
+Operators + - * / work elementwise with other mmVarArray objects,
+mmVar objects, numbers or arrays
+Functions sq sqrt exp log ipow sin cos also accept mmVarArray objects
+Undefined typical values are NaN in the typ array
+'''
+
+class mmVarArray(object):
+    __slots__ = ('max','min','typ')
+    
+    # NumPy arrays use the reflected operators of this class
+    # so that array + mmVarArray also gives a mmVarArray
+    __array_ufunc__ = None
+    
+    # CONSTRUCTORS ##################################
+    
+    def __init__(self,ma,mi,typ=None):
+        self.max = np.asarray(ma,dtype=np.float64)
+        self.min = np.asarray(mi,dtype=np.float64)
+        if typ is None:
+            self.typ = np.full(self.max.shape,_NAN)
+        else:
+            self.typ = np.asarray(typ,dtype=np.float64)
+            
+    @classmethod
+    def fromList(cls,vars):
+        # Build the object from a list of mmVar objects or numbers
+        values = [get_values(x) for x in vars]
+        ma = [v[0] for v in values]
+        mi = [v[1] for v in values]
+        typ = [_NAN if v[2] is None else v[2] for v in values]
+        return cls(ma,mi,typ)
+        
+    def toList(self):
+        # Return a list of mmVar objects
+        # Elements with equal limits are returned as numbers
+        ret = []
+        for i in range(len(self.max)):
+            ma = float(self.max[i])
+            mi = float(self.min[i])
+            if ma == mi:
+                ret.append(ma)
+            else:
+                ret.append(mmVar._fast(ma,mi,float(self.typ[i])))
+        return ret
+        
+    def __len__(self):
+        return len(self.max)
+        
+    def __str__(self):
+        return '['+', '.join(str(x) for x in self.toList())+']'
+        
+    # INTERNAL METHODS ##############################
+    
+    @staticmethod
+    def _operand(other):
+        # Get max, min and typ of the other operand
+        if other.__class__ is mmVarArray:
+            return other.max,other.min,other.typ
+        if other.__class__ is mmVar:
+            return other._get_values()
+        return other,other,other
+        
+    def _new(self,ma,mi,ty1,ty2,op):
+        # Build the result of an operation on typical values
+        # NaN undefined typical values propagate
+        return mmVarArray(ma,mi,op(ty1,ty2))
+        
+    @staticmethod
+    def _checkDivisor(ma,mi):
+        # Check that a divisor range doesn't include zero
+        if np.any((np.asarray(mi) <= 0) & (np.asarray(ma) >= 0)):
+            raise mmEx('Quotient range includes zero')
+        
+    # ARITHMETIC OPERATORS ##########################
+    
+    def __add__(self,other):
+        ma2,mi2,ty2 = self._operand(other)
+        return self._new(self.max+ma2,self.min+mi2,self.typ,ty2,np.add)
+        
+    __radd__ = __add__
+        
+    def __neg__(self):
+        return mmVarArray(-self.min,-self.max,-self.typ)
+        
+    def __sub__(self,other):
+        ma2,mi2,ty2 = self._operand(other)
+        return self._new(self.max-mi2,self.min-ma2,self.typ,ty2,np.subtract)
+        
+    def __rsub__(self,other):
+        return (-self).__add__(other)
+        
+    def __mul__(self,other):
+        ma2,mi2,ty2 = self._operand(other)
+        return self._corners(ma2,mi2,ty2,np.multiply)
+        
+    __rmul__ = __mul__
+    
+    def _corners(self,ma2,mi2,ty2,op):
+        # Limits of op between the limits and a (ma2,mi2) range
+        # taken from the four corners
+        v1 = op(self.max,ma2)
+        v2 = op(self.max,mi2)
+        v3 = op(self.min,ma2)
+        v4 = op(self.min,mi2)
+        ma = np.maximum(np.maximum(v1,v2),np.maximum(v3,v4))
+        mi = np.minimum(np.minimum(v1,v2),np.minimum(v3,v4))
+        return self._new(ma,mi,self.typ,ty2,op)
+        
+    def __truediv__(self,other):
+        ma2,mi2,ty2 = self._operand(other)
+        self._checkDivisor(ma2,mi2)
+        return self._corners(ma2,mi2,ty2,np.true_divide)
+        
+    def __rtruediv__(self,other):
+        return mmVarArray(*self._operand(other))/self
+        
+    # FUNCTIONS #####################################
+    
+    def _apply(self,ma,mi,f):
+        # Build the result of a function of the variables
+        return mmVarArray(ma,mi,f(self.typ))
+    
+    def sq(self):
+        return self.ipow(2)
+        
+    def ipow(self,exp):
+        v1 = self.max**exp
+        v2 = self.min**exp
+        ma = np.maximum(v1,v2)
+        mi = np.minimum(v1,v2)
+        if exp % 2 == 0:
+            mi = np.where((self.min < 0) & (self.max > 0),0.0,mi)
+        return self._apply(ma,mi,lambda x: x**exp)
+        
+    def sqrt(self):
+        if np.any(self.min < 0):
+            raise mmEx('Function sqrt() can only operate with always positive numbers')
+        return self._apply(np.sqrt(self.max),np.sqrt(self.min),np.sqrt)
+        
+    def exp(self):
+        return self._apply(np.exp(self.max),np.exp(self.min),np.exp)
+        
+    def log(self):
+        if np.any(self.min <= 0):
+            raise mmEx('Function log() can only operate with always positive numbers')
+        return self._apply(np.log(self.max),np.log(self.min),np.log)
+        
+    def _periodic(self,f,pmax,pmin):
+        # Limits of a 2*pi periodic function
+        # with maximum at pmax and minimum at pmin
+        v1 = f(self.max)
+        v2 = f(self.min)
+        ma = np.maximum(v1,v2)
+        mi = np.minimum(v1,v2)
+        hasMax = np.ceil((self.min-pmax)/(2*np.pi)) <= np.floor((self.max-pmax)/(2*np.pi))
+        hasMin = np.ceil((self.min-pmin)/(2*np.pi)) <= np.floor((self.max-pmin)/(2*np.pi))
+        ma = np.where(hasMax,1.0,ma)
+        mi = np.where(hasMin,-1.0,mi)
+        return self._apply(ma,mi,f)
+        
+    def sin(self):
+        return self._periodic(np.sin,np.pi/2,3*np.pi/2)
+        
+    def cos(self):
+        return self._periodic(np.cos,0.0,np.pi)
+
 # Helper functions  
 
 def get_values(x):
     # Return maximum, minimum and typical if x is mmVAr
     # If not, return tuple (x,x,x)
-    if isinstance(x,mmVar):
+    if x.__class__ is mmVar:
         # Get self values
         ma,mi,ty = x._get_values()
     else:
@@ -548,10 +1067,120 @@ def get_values(x):
         ty = x    
     return ma,mi,ty        
       
+# Affine forms ###################################################
+# Each variable is also tracked as center + sum(coef[i]*e[i])
+# with e[i] noise symbols in the [-1,1] range shared between variables
+# so that correlated operands, like in x-x, don't widen the limits
+
+# Affine forms are only tracked if useAffine is True
+# They are slower than plain intervals
+useAffine = False
+
+# Noise symbol identifiers
+_noiseId = itertools.count(1)
+
+# Maximum number of noise symbols in one affine form
+_MAX_NOISE = 12
+
+# Relative floating point error
+_EPS = np.finfo(np.float64).eps
+
+def _get_affine(x):
+    # Return affine form of x as (center,noise)
+    if x.__class__ is mmVar:
+        return x._affine()
+    return x,{}
+    
+def _radius(noise):
+    # Maximum deviation from the center
+    return sum(abs(v) for v in noise.values())
+    
+def _affine_lin(c1,n1,c2,n2,k):
+    # Affine form of (c1,n1)+k*(c2,n2)
+    noise = dict(n1)
+    for i,v in n2.items():
+        noise[i] = noise.get(i,0)+k*v
+    return c1+k*c2,noise
+    
+def _affine_scale(c1,n1,k):
+    # Affine form of k*(c1,n1)
+    return k*c1,dict((i,k*v) for i,v in n1.items())
+    
+def _affine_mul(c1,n1,c2,n2):
+    # Affine form of the product
+    # The non linear term is added as a new noise symbol
+    noise = dict((i,c2*v) for i,v in n1.items())
+    for i,v in n2.items():
+        noise[i] = noise.get(i,0)+c1*v
+    rad = _radius(n1)*_radius(n2)
+    if rad:
+        noise[next(_noiseId)] = rad
+    return c1*c2,noise
+    
+def _affine_sq(c1,n1):
+    # Affine form of the square
+    # The quadratic term is always in the [0,r^2] range
+    rad = _radius(n1)
+    c2,n2 = _affine_scale(c1,n1,2*c1)
+    if rad:
+        n2[next(_noiseId)] = rad*rad/2
+    return c1*c1+rad*rad/2,n2
+    
+def _affine_inv(c1,n1):
+    # Affine form of the inverse using a min-range approximation
+    # Returns None if the affine form includes zero
+    rad = _radius(n1)
+    lo = c1-rad
+    hi = c1+rad
+    if lo <= 0 <= hi:
+        return None
+    if hi < 0:
+        # Use 1/x = -(1/(-x))
+        c2,n2 = _affine_scale(c1,n1,-1)
+        c2,n2 = _affine_inv(c2,n2)
+        return _affine_scale(c2,n2,-1)
+    alpha = -1.0/(hi*hi)
+    d1 = 1.0/lo - alpha*lo
+    d2 = 1.0/hi - alpha*hi
+    c2,n2 = _affine_scale(c1,n1,alpha)
+    if d1 != d2:
+        n2[next(_noiseId)] = (d1-d2)/2
+    return c2+(d1+d2)/2,n2
+    
+def _affine_result(ma,mi,ty,c,noise):
+    # Build the result of an operation
+    # Limits are the intersection of the interval and affine limits
+    # The smallest noise symbols are joined in a new one if there are
+    # too many of them
+    if len(noise) > _MAX_NOISE:
+        keys = sorted(noise,key=lambda i: abs(noise[i]))
+        cut = len(noise) - _MAX_NOISE + 1
+        joined = sum(abs(noise.pop(i)) for i in keys[:cut])
+        noise[next(_noiseId)] = joined
+    # The floating point error of the affine form is added as
+    # a new noise symbol so that its limits are rounded outwards
+    rad = _radius(noise)
+    err = (abs(c)+rad)*_EPS*(len(noise)+4)
+    if err:
+        noise[next(_noiseId)] = err
+        rad = rad + 2*err
+    ma,mi = max(ma,mi),min(ma,mi)
+    ma = min(ma,c+rad)
+    mi = max(mi,c-rad)
+    if ma <= mi:
+        return c
+    return mmVar._fast(ma,mi,ty,c,noise)
         
 # Mathematical functions
 
 def sq(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.sq()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('sq',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
@@ -559,25 +1188,36 @@ def sq(x):
     if ma1 == mi1:
         return ma1*ma1
           
-    # Check for zero in range
-    if mi1 < 0 < ma1:
-        mi2 = 0
-        ma2 = max(ma1*ma1,mi1*mi1)
+    # Calculate limits (min is zero if range includes zero)
+    sign = x._sign_class()
+    if sign > 0:
+        ma2,mi2 = ma1*ma1,mi1*mi1
+    elif sign < 0:
+        ma2,mi2 = mi1*mi1,ma1*ma1
     else:
-        mi2 = min(ma1*ma1,mi1*mi1)
-        ma2 = max(ma1*ma1,mi1*mi1)
+        if numbaFound and ma1.__class__ is float and mi1.__class__ is float:
+            ma2,mi2 = _sq_intervalJit(ma1,mi1)
+        else:
+            ma2,mi2 = _sq_interval(ma1,mi1)
             
-    # Check self typical for none
-    if ty1 == None:
-        ty2 = None
-    else:
-        ty2 = ty1*ty1
+    # Typical value (NaN if not defined)
+    ty2 = ty1*ty1
            
     # Return new variable
-    mm = mmVar(ma2,mi2,ty2)
-    return mm
+    if not useAffine:
+        return mmVar._fast(ma2,mi2,ty2)
+    c1,n1 = _get_affine(x)
+    c2,n2 = _affine_sq(c1,n1)
+    return _affine_result(ma2,mi2,ty2,c2,n2)
       
 def sqrt(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.sqrt()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('sqrt',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
@@ -587,45 +1227,51 @@ def sqrt(x):
         
     # Check if max = min
     if ma1 == mi1:
-        return np.sqrt(ma1)
+        return math.sqrt(ma1)
       
     # Calculate limits 
-    ma3 = np.sqrt(ma1)
-    mi3 = np.sqrt(mi1)
+    ma3 = math.sqrt(ma1)
+    mi3 = math.sqrt(mi1)
             
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
-    else:
-        ty3 = np.sqrt(ty1)
+    # Typical value (NaN if not defined)
+    ty3 = math.sqrt(ty1)
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm            
+    return mmVar._fast(ma3,mi3,ty3)
       
 def exp(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.exp()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('exp',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
     # Check if max = min
     if ma1 == mi1:
-        return np.exp(ma1)
+        return math.exp(ma1)
       
     # Calculate limits 
-    ma3 = np.exp(ma1)
-    mi3 = np.exp(mi1)
+    ma3 = math.exp(ma1)
+    mi3 = math.exp(mi1)
             
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
-    else:
-        ty3 = np.exp(ty1)
+    # Typical value (NaN if not defined)
+    ty3 = math.exp(ty1)
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm       
+    return mmVar._fast(ma3,mi3,ty3)
         
 def log(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.log()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('log',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
@@ -635,21 +1281,17 @@ def log(x):
         
     # Check if max = min
     if ma1 == mi1:
-        return np.log(ma1)
+        return math.log(ma1)
       
     # Calculate limits 
-    ma3 = np.log(ma1)
-    mi3 = np.log(mi1)
+    ma3 = math.log(ma1)
+    mi3 = math.log(mi1)
             
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
-    else:
-        ty3 = np.log(ty1)
+    # Typical value (NaN if not defined)
+    ty3 = math.log(ty1)
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm          
+    return mmVar._fast(ma3,mi3,ty3)
         
 def ipow(base,exp):
     '''
@@ -669,34 +1311,41 @@ def ipow(base,exp):
     if exp < 0:
         raise mmEx('Exponent on ipow() should be positive or zero')     
         
+    # Vector of variables
+    if base.__class__ is mmVarArray:
+        return base.ipow(exp)
+    # Lazy expression
+    if base.__class__ is mmLazy:
+        return mmLazy('ipow',base,exp)
+        
     # Get base values
     ma1,mi1,ty1 = get_values(base)
         
     # Check if max = min
     if ma1 == mi1:
-        return np.power(ma1,exp)
+        return ma1**exp
     
-    # Basic solution
-    val1 = np.power(ma1,exp)
-    val2 = np.power(mi1,exp)
-    mi3 = min(val1,val2)
-    ma3 = max(val1,val2)
-    
-    # Special case for zero in range and even exponent
-    if (exp//2 == exp/2) and (mi1 < 0 < ma1):
-        mi3 = 0
-    
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
+    # Calculate limits (min is zero for an even exponent
+    # if range includes zero)
+    if numbaFound and ma1.__class__ is float and mi1.__class__ is float:
+        ma3,mi3 = _ipow_intervalJit(ma1,mi1,exp)
     else:
-        ty3 = np.power(ty1,exp)
+        ma3,mi3 = _ipow_interval(ma1,mi1,exp)
+    
+    # Typical value (NaN if not defined)
+    ty3 = ty1**exp
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm        
+    return mmVar._fast(ma3,mi3,ty3)
         
 def sin(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.sin()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('sin',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
@@ -711,28 +1360,31 @@ def sin(x):
     ma3 = max(val1,val2)
     
     # Check for maximum in range
-    n1 = np.ceil((mi1-np.pi/2)/(2*np.pi))
-    n2 = np.floor((ma1-np.pi/2)/(2*np.pi)) 
+    n1 = math.ceil((mi1-math.pi/2)/(2*math.pi))
+    n2 = math.floor((ma1-math.pi/2)/(2*math.pi)) 
     if n1 <= n2:
         ma3 = 1.0 # There is maximum
         
     # Check for minimum in range
-    n1 = np.ceil((mi1-3*np.pi/2)/(2*np.pi))
-    n2 = np.floor((ma1-3*np.pi/2)/(2*np.pi)) 
+    n1 = math.ceil((mi1-3*math.pi/2)/(2*math.pi))
+    n2 = math.floor((ma1-3*math.pi/2)/(2*math.pi)) 
     if n1 <= n2:
         mi3 = -1.0 # There is minimum        
             
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
-    else:
-        ty3 = np.sin(ty1)
+    # Typical value (NaN if not defined)
+    ty3 = np.sin(ty1)
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm    
+    return mmVar._fast(ma3,mi3,ty3)
 
 def cos(x):
+    # Vector of variables
+    if x.__class__ is mmVarArray:
+        return x.cos()
+    # Lazy expression
+    if x.__class__ is mmLazy:
+        return mmLazy('cos',x)
+        
     # Get x values
     ma1,mi1,ty1 = get_values(x)
         
@@ -747,54 +1399,296 @@ def cos(x):
     ma3 = max(val1,val2)
     
     # Check for maximum in range
-    n1 = np.ceil(mi1/(2*np.pi))
-    n2 = np.floor(ma1/(2*np.pi)) 
+    n1 = math.ceil(mi1/(2*math.pi))
+    n2 = math.floor(ma1/(2*math.pi)) 
     if n1 <= n2:
         ma3 = 1.0 # There is maximum
         
     # Check for minimum in range
-    n1 = np.ceil((mi1-np.pi)/(2*np.pi))
-    n2 = np.floor((ma1-np.pi)/(2*np.pi)) 
+    n1 = math.ceil((mi1-math.pi)/(2*math.pi))
+    n2 = math.floor((ma1-math.pi)/(2*math.pi)) 
     if n1 <= n2:
         mi3 = -1.0 # There is minimum  
             
-    # Check self typical for none
-    if ty1 == None:
-        ty3 = None
-    else:
-        ty3 = np.cos(ty1)
+    # Typical value (NaN if not defined)
+    ty3 = np.cos(ty1)
            
     # Return new variable
-    mm = mmVar(ma3,mi3,ty3)
-    return mm        
+    return mmVar._fast(ma3,mi3,ty3)
+        
+# Lazy expressions ###############################################
+
+'''
+mmLazy Class definition
+
+Holds an expression of mmVar objects and numbers as a graph
+that is only calculated when a result is requested
+
+Constructor
+   lazy(x)              Wraps a mmVar object or a number
+   
+Operators + - * / and functions sq sqrt exp log ipow sin cos
+on mmLazy objects return new mmLazy nodes without calculations
+Nodes shared by several expressions are calculated only once
+
+   .evaluate()          Calculates the expression using mmVar operations
+   .maximum() .minimum() .typical()  Values of the evaluated expression
+   .reset()             Clears the stored results if leaf values change
+   .sample(n)           Calculates the expression on n montecarlo cases
+                        of the leaf variables and returns an array
+   .evaluateIv(dps)     Calculates the expression with mpmath intervals
+                        using dps decimal digits (needs mpmath)
+   .evaluateTuned(tol,dps)  Calculates the expression with mmVar operations
+                        and only if the result is wider than tol times
+                        its magnitude repeats it with evaluateIv()
+'''
+
+class mmLazy(object):
+    __slots__ = ('op','left','right','_cache')
+    
+    # Number of evaluateTuned() calls that needed evaluateIv()
+    escalations = 0
+    
+    # CONSTRUCTOR ###################################
+    
+    def __init__(self,op,left=None,right=None):
+        self.op = op          # Operation or 'leaf'
+        self.left = left      # First operand node or leaf value
+        self.right = right    # Second operand node, exponent or None
+        self._cache = None    # Stored result of evaluate()
+        
+    @staticmethod
+    def _node(x):
+        # Wrap x in a leaf node if it is not a node
+        if x.__class__ is mmLazy:
+            return x
+        return mmLazy('leaf',x)
+        
+    # OPERATORS #####################################
+    
+    def __add__(self,other):
+        return mmLazy('+',self,mmLazy._node(other))
+        
+    def __radd__(self,other):
+        return mmLazy('+',mmLazy._node(other),self)
+        
+    def __sub__(self,other):
+        return mmLazy('-',self,mmLazy._node(other))
+        
+    def __rsub__(self,other):
+        return mmLazy('-',mmLazy._node(other),self)
+        
+    def __mul__(self,other):
+        return mmLazy('*',self,mmLazy._node(other))
+        
+    def __rmul__(self,other):
+        return mmLazy('*',mmLazy._node(other),self)
+        
+    def __truediv__(self,other):
+        return mmLazy('/',self,mmLazy._node(other))
+        
+    def __rtruediv__(self,other):
+        return mmLazy('/',mmLazy._node(other),self)
+        
+    def __neg__(self):
+        return mmLazy('neg',self)
+        
+    # EVALUATION ####################################
+    
+    def _walk(self,leaf,funcs,useCache):
+        # Evaluate the graph in post order without recursion
+        # leaf(value) gives the value of a leaf
+        # funcs maps each operation to its function
+        # Each node is calculated only once
+        memo = {}
+        stack = [self]
+        while stack:
+            node = stack[-1]
+            key = id(node)
+            if key in memo:
+                stack.pop()
+                continue
+            if useCache and node._cache is not None:
+                value = node._cache
+            elif node.op == 'leaf':
+                value = leaf(node.left)
+            else:
+                pending = [c for c in (node.left,node.right)
+                               if c.__class__ is mmLazy and id(c) not in memo]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                a = memo[id(node.left)]
+                if node.right is None:
+                    value = funcs[node.op](a)
+                elif node.right.__class__ is mmLazy:
+                    value = funcs[node.op](a,memo[id(node.right)])
+                else:
+                    value = funcs[node.op](a,node.right)
+                if useCache:
+                    node._cache = value
+            memo[key] = value
+            stack.pop()
+        return memo[id(self)]
+        
+    def evaluate(self):
+        # Calculate the expression with mmVar operations
+        return self._walk(lambda x: x,_lazyFuncs,True)
+        
+    def reset(self):
+        # Clear the stored results of all nodes
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node._cache = None
+            for c in (node.left,node.right):
+                if c.__class__ is mmLazy and c._cache is not None:
+                    stack.append(c)
+                    
+    def sample(self,n):
+        # Calculate the expression for n montecarlo cases
+        # Each mmVar leaf gets its own array of cases
+        cases = {}
+        def leaf(x):
+            if x.__class__ is not mmVar:
+                return x
+            if id(x) not in cases:
+                cases[id(x)] = x.montecarloArray(n)
+            return cases[id(x)]
+        return self._walk(leaf,_lazySampleFuncs,False)
+        
+    def evaluateIv(self,dps=30):
+        # Calculate the expression with mpmath interval arithmetic
+        # Limits are rounded outwards when converted back to float
+        if not mpmathFound:
+            raise mmEx('evaluateIv needs the mpmath module')
+        iv = mpmath.iv
+        def leaf(x):
+            if x.__class__ is mmVar:
+                ma,mi,ty = x._get_values()
+                return iv.mpf([mi,ma])
+            if x.__class__ is mmVarArray:
+                raise mmEx('evaluateIv does not support mmVarArray')
+            return iv.mpf(x)
+        old = iv.dps
+        iv.dps = dps
+        try:
+            r = self._walk(leaf,_lazyIvFuncs,False)
+        finally:
+            iv.dps = old
+        ma = float(np.nextafter(float(r.b),np.inf))
+        mi = float(np.nextafter(float(r.a),-np.inf))
+        return ma,mi
+        
+    def evaluateTuned(self,tol=1e-9,dps=30):
+        # Calculate the expression with mmVar operations and
+        # use evaluateIv() to tighten the limits only if the result
+        # is wider than tol times its magnitude
+        r = self.evaluate()
+        if r.__class__ is not mmVar or not mpmathFound:
+            return r
+        ma,mi,ty = r._get_values()
+        if (ma-mi) <= tol*max(abs(ma),abs(mi)):
+            return r
+        mmLazy.escalations += 1
+        ma2,mi2 = self.evaluateIv(dps)
+        ma3 = min(ma,ma2)
+        mi3 = max(mi,mi2)
+        if ma3 == mi3:
+            return ma3
+        return mmVar._fast(ma3,mi3,ty)
+        
+    # ACCES TO CONTENTS #############################
+        
+    def maximum(self):
+        return get_values(self.evaluate())[0]
+        
+    def minimum(self):
+        return get_values(self.evaluate())[1]
+        
+    def typical(self):
+        ty = get_values(self.evaluate())[2]
+        if ty is None or ty != ty:
+            return None
+        return ty
+        
+    def __str__(self):
+        return str(self.evaluate())
+        
+def lazy(x):
+    '''Wraps a mmVar object or a number in a mmLazy expression
+    '''
+    return mmLazy._node(x)
+    
+# Functions of each operation on evaluation
+_lazyFuncs = {'+':operator.add,'-':operator.sub,'*':operator.mul,
+              '/':operator.truediv,'neg':operator.neg,
+              'sq':sq,'sqrt':sqrt,'exp':exp,'log':log,
+              'ipow':ipow,'sin':sin,'cos':cos}
+              
+# Functions of each operation on montecarlo arrays
+_lazySampleFuncs = {'+':operator.add,'-':operator.sub,'*':operator.mul,
+                    '/':operator.truediv,'neg':operator.neg,
+                    'sq':np.square,'sqrt':np.sqrt,'exp':np.exp,'log':np.log,
+                    'ipow':np.power,'sin':np.sin,'cos':np.cos}
+        
+# Functions of each operation on mpmath intervals
+if mpmathFound:
+    _lazyIvFuncs = {'+':operator.add,'-':operator.sub,'*':operator.mul,
+                    '/':operator.truediv,'neg':operator.neg,
+                    'sq':lambda x: x**2,'sqrt':mpmath.iv.sqrt,
+                    'exp':mpmath.iv.exp,'log':mpmath.iv.log,
+                    'ipow':operator.pow,'sin':mpmath.iv.sin,'cos':mpmath.iv.cos}
         
 # Functions to get a value instance from the mmVAr objects ########
+
+# Method callers for the bulk functions
+_setTypicalCall = methodcaller('setTypical')
+_montecarloCall = methodcaller('montecarlo')
+_individualCall = methodcaller('individual')
+_genericCall    = methodcaller('generic')
         
 def setTypical(*args):
     '''Sets all variable arguments as typical values
       Argumnents : numbers or mmVar objects
       Returns a tuple with the values
     '''  
-    ret=[]
-    for element in args:
-        if isinstance(element,mmVar): 
-           ret.append(element.setTypical())
-        else:    
-           ret.append(element)
-    return tuple(ret)        
+    call = _setTypicalCall
+    return tuple(call(e) if e.__class__ is mmVar else e for e in args)        
            
 def montecarlo(*args):
     '''Sets all variable arguments as a montecarlo instances
       Argumnents : numbers or mmVar objects
       Returns a tuple with the values
     '''
-    ret=[]
-    for element in args:
-        if isinstance(element,mmVar): 
-           ret.append(element.montecarlo())
-        else:    
-           ret.append(element)
-    return tuple(ret)          
+    call = _montecarloCall
+    return tuple(call(e) if e.__class__ is mmVar else e for e in args)          
+    
+def montecarloArray(n,*args):
+    '''Gets n montecarlo instances of all variable arguments at once
+      Arguments : number of instances, numbers or mmVar objects
+      Returns a tuple with an array of n values for each mmVar object
+      and the other arguments unchanged
+      The mmVar objects are not modified
+    '''
+    return tuple(e.montecarloArray(n) if e.__class__ is mmVar else e for e in args)
+    
+def seed(s=None):
+    '''Sets a new random number generator with the given seed
+    Use it to obtain repeatable montecarlo results
+      s : Seed (None gives a non repeatable seed)
+    '''
+    global _rng,_rngUniform
+    try:
+        _rng = np.random.default_rng(s)
+        _rngUniform = _rng.random
+    except AttributeError:
+        np.random.seed(s)
+        _rng = np.random
+        _rngUniform = _rng.random_sample
+    # Discard the buffered random numbers
+    mmVar._rng_buf = None
+    mmVar._nrm_buf = None
   
 # Functions to set mmVAr objects as variable in their range ############
   
@@ -802,15 +1696,17 @@ def individual(*args):
     '''Sets all variable arguments as unique
       Arguments : list of mmVar objects
     '''
+    call = _individualCall
     for element in args:
-        element.individual()  
+        call(element)
   
 def generic(*args):
     '''Sets all variable arguments as not unique
       Arguments : list of mmVar objects
     '''  
+    call = _genericCall
     for element in args:
-        element.generic() 
+        call(element)
         
 # Functions to tests several cases
 
@@ -831,10 +1727,6 @@ def doMontecarlo(n,func,*vars):
     return ret                      # Return vector
 '''    
   
-# Montecarlo compare helper function  
-def _monteCompare(a,b):
-    return a[0]-b[0]
-  
 def doMontecarlo(n,func,*vars):
     '''Performs several montecarlo executions
     Arguments:
@@ -846,21 +1738,131 @@ def doMontecarlo(n,func,*vars):
       vData   : A sorted list of elements. Each one is a list with:
                     Value of the function
                     Tuple of coordinates of the function
+    All cases are drawn at once but func is called once for each case
+    Use doMontecarloVec if func operates with numpy arrays
     '''
-    vRet  = []                        # Return list
-    vData = []                        # Data list
-    for i in range(n):                # For all montecarlo cases
-        mVars = montecarlo(*vars)  # Calculate vars for this case
-        value = func(*mVars)          # Obtain function value
-        vRet.append(value)            # Add resut to vRet
-        subList = [value,mVars]    
-        vData.append(subList)         # Add data to vData
+    if len(vars) == 0:
+        vRet = sorted(func() for i in range(n))
+        return vRet,[[value,()] for value in vRet]
+    vRet,vData = _monteSort(*_monteLoop(n,func,vars))
+    return vRet.tolist(),vData
        
-    # Sort lists
-    vRet.sort() 
-    vData.sort(key=functools.cmp_to_key(_monteCompare));            
+def _monteColumns(n,vars):
+    # Draw all cases for each variable
+    # Returns a tuple with one array for each mmVar
+    # and the value itself for other arguments
+    cols = montecarloArray(n,*vars)
+    if n == 0:
+        return cols
+    for element,col in zip(vars,cols):
+        if element.__class__ is mmVar:
+            element._setVal(col[-1])  # Leave last case as montecarlo() does
+    return cols
+    
+def _monteLoop(n,func,vars):
+    # Draw all cases and call func once for each one
+    # Returns the array of values and the function
+    # that gives the coordinates of case i
+    cols = _monteColumns(n,vars)
+    lists = [c.tolist() if isinstance(c,np.ndarray) else [c]*n for c in cols]
+    cases = list(zip(*lists))
+    values = np.array([func(*c) for c in cases])
+    return values,cases.__getitem__
+    
+def _monteSort(values,case):
+    # Sort the results of the montecarlo cases
+    # case(i) gives the coordinates of case i
+    order = np.argsort(values,kind='mergesort')
+    vRet  = values[order]
+    vData = [[values[i],case(i)] for i in order]
     return vRet,vData
        
+def doMontecarloVec(n,func,*vars):
+    '''Performs several montecarlo executions drawing all cases at once
+    func is called only one time with one array of n values for
+    each mmVar argument, so it must operate with numpy arrays
+    Use doMontecarlo if it doesn't
+    Arguments:
+      n       : Number of montecarlo runs
+      func    : Function to evaluate with *vars arguments
+      *vars   : List of nnVars contained in the function
+    Returns:
+      vRes    : A sorted array of func values on each run
+      vData   : A sorted list of elements. Each one is a list with:
+                    Value of the function
+                    Tuple of coordinates of the function
+    '''
+    # Draw all cases for each variable
+    cols = _monteColumns(n,vars)
+    
+    # Coordinates of case i
+    def case(i):
+        return tuple(c[i] if isinstance(c,np.ndarray) else c for c in cols)
+    
+    # Evaluate all cases in one call
+    values = np.broadcast_to(np.asarray(func(*cols)),(n,))
+       
+    # Sort results
+    return _monteSort(values,case)
+    
+# Compiled montecarlo kernels for each (func,number of arguments)
+_mcKernels = {}
+    
+def _mcKernel(func,nargs):
+    # Generate the code that evaluates func for all cases
+    # and compile it with Numba
+    key = (func,nargs)
+    if key in _mcKernels:
+        return _mcKernels[key]
+    if hasattr(func,'py_func'):
+        f = func                 # Already compiled
+    else:
+        f = numba.njit(func)
+    args = ','.join('cols[%d,i]' % k for k in range(nargs))
+    src = ('def kernel(cols,out):\n'
+           '    for i in prange(out.size):\n'
+           '        out[i] = f(%s)\n' % args)
+    env = {'f':f,'prange':prange}
+    exec(src,env)
+    kernel = numba.njit(parallel=True)(env['kernel'])
+    _mcKernels[key] = kernel
+    return kernel
+       
+def doMontecarloJit(n,func,*vars):
+    '''Performs several montecarlo executions compiling func with Numba
+    The cases are evaluated in parallel in compiled code
+    func must take and return floats and can only use operations
+    supported by Numba in nopython mode:
+       Arithmetic operators + - * / ** and comparisons
+       math and numpy scalar functions (math.sqrt, np.exp, np.sin...)
+       if/else and loops
+    Functions of this module, like sq() or sqrt(), cannot be used
+    Without Numba func is called once for each case
+    Arguments:
+      n       : Number of montecarlo runs
+      func    : Function to evaluate with *vars arguments
+      *vars   : List of nnVars contained in the function
+    Returns:
+      vRes    : A sorted array of func values on each run
+      vData   : A sorted list of elements. Each one is a list with:
+                    Value of the function
+                    Tuple of coordinates of the function
+    '''
+    if not numbaFound:
+        return _monteSort(*_monteLoop(n,func,vars))
+        
+    # Draw all cases for each variable
+    cols = np.empty((len(vars),n))
+    for k,col in enumerate(_monteColumns(n,vars)):
+        cols[k] = col
+        
+    # Evaluate all cases
+    values = np.empty(n)
+    _mcKernel(func,len(vars))(cols,values)
+    
+    # Sort results
+    return _monteSort(values,lambda i: tuple(cols[:,i]))
+       
 def cumulative(v):
     '''
     Generates a cumulative function from a sorted vector of values
@@ -869,12 +1871,8 @@ def cumulative(v):
     Returns:
       y : Cumulative values 
     '''
-    y = []
-    count = 0
-    for value in v:
-        count = count+1
-        y.append(count)
-    y = np.array(y)/count
+    count = len(v)
+    y = np.arange(1,count+1,dtype=np.float64)/count
     return y
      
 def prob(v,a,b):
@@ -888,11 +1886,8 @@ def prob(v,a,b):
     '''   
     mi = min(a,b)
     ma = max(a,b)    
-    total = 0
-    count = 0    
-    for element in v:
-        total = total + 1
-        if mi <= element <= ma:
-            count = count + 1
-    return count/total   
+    v = np.asarray(v)
+    # Binary search of the limits in the sorted vector
+    count = int(np.searchsorted(v,ma,side='right') - np.searchsorted(v,mi,side='left'))
+    return count/len(v)   
     
\ No newline at end of file
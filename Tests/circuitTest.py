@@ -0,0 +1,235 @@
+'''
+circuitTest.py
+Regression circuits for the circuit module
+
+Each circuit is solved and its solution is compared with
+the expected expressions
+If SymEngine is available the circuits are also solved
+with the SymPy solver so that both solvers are checked
+
+Run from the repository folder with:
+   python -m unittest discover -s Tests -p "*Test.py"
+
+History:
+  15/10/2026 : First version
+'''
+
+# Python 2.7 compatibility
+from __future__ import print_function
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import sympy
+
+# Modules folder
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','Modules'))
+
+import circuit
+
+'''
+Test circuits
+Each entry has a function that builds the circuit
+and the dictionary of expected solutions
+'''
+
+def divider(c):
+    # V, R and VM
+    c.addV('Vs',1,0,5)
+    c.addR('R1',1,2,1000)
+    c.addR('R2',2,0,2000)
+    c.addVM('Vo',2,0)
+
+def rlc(c):
+    # R, C and L in a ladder
+    c.addV('Vi',1,0)
+    c.addR('R1',1,2)
+    c.addC('C1',2,0,1e-6)
+    c.addL('L1',2,3,1e-3)
+    c.addR('R2',3,0,50)
+    c.addVM('Vo',3,0)
+
+def currentSource(c):
+    # I and IM
+    c.addI('I1',0,1,1e-3)
+    c.addR('R1',1,0,1000)
+    c.addIM('Ir',1,2)
+    c.addR('R2',2,0,500)
+    c.addVM('Vx',1,2)
+
+def cvs(c):
+    # Voltage controlled voltage source
+    c.addV('Vi',1,0,1)
+    c.addR('R1',1,2,1e3)
+    c.addVM('Vc',2,0)
+    c.addR('R2',2,0,1e3)
+    c.addCVS('A',3,0,'Vc',10)
+    c.addR('RL',3,0,100)
+    c.addVM('Vo',3,0)
+
+def cis(c):
+    # Voltage controlled current source
+    c.addV('Vi',1,0)
+    c.addR('R1',1,2)
+    c.addVM('Vc',2,0)
+    c.addR('R2',2,0)
+    c.addCIS('G',0,3,'Vc')
+    c.addR('RL',3,4)
+    c.addC('C',4,0)
+    c.addVM('Vo',4,3)
+
+def floatingSource(c):
+    # Voltage source not connected to node 0
+    c.addV('V1',1,2,3)
+    c.addR('R1',1,0,10)
+    c.addR('R2',2,0,20)
+    c.addIM('Iv',3,0)
+    c.addR('R3',2,3,5)
+    c.addVM('Vd',1,2)
+
+def chainedMeasures(c):
+    # Several measures whose substitutions are queued
+    c.addV('Vi',1,0,2)
+    c.addR('R1',1,2,10)
+    c.addIM('Im',2,3)
+    c.addR('R2',3,4,20)
+    c.addVM('Vf',3,4)
+    c.addR('R3',4,0,30)
+    c.addCVS('E',5,0,'Vf',3)
+    c.addR('R4',5,0,1)
+    c.addVM('Vo',5,0)
+
+def groundedMeasures(c):
+    # Measures connected to node 0 on both sides
+    c.addI('I1',0,1,1)
+    c.addR('R1',1,0)
+    c.addVM('V1',1,0)
+    c.addCIS('G',0,2,'V1',2)
+    c.addR('R2',2,0)
+    c.addVM('V2',0,2)
+    c.addIM('Ig',3,2)
+    c.addC('C1',3,0)
+
+circuits = [
+  (divider,{
+     'Vo' : 'R2*Vs/(R1 + R2)',
+     'iVs': 'Vs/(R1 + R2)',
+     'v1' : 'Vs'}),
+  (rlc,{
+     'Vo' : 'R2*Vi/(C1*L1*R1*s**2 + C1*R1*R2*s + L1*s + R1 + R2)',
+     'iVi': '(C1*L1*Vi*s**2 + C1*R2*Vi*s + Vi)/(C1*L1*R1*s**2 + C1*R1*R2*s + L1*s + R1 + R2)',
+     'v1' : 'Vi',
+     'v2' : '(L1*Vi*s + R2*Vi)/(C1*L1*R1*s**2 + C1*R1*R2*s + L1*s + R1 + R2)'}),
+  (currentSource,{
+     'Ir' : 'I1*R1/(R1 + R2)',
+     'Vx' : '0',
+     'v2' : '-I1*R1*R2/(R1 + R2)'}),
+  (cvs,{
+     'Vc' : 'R2*Vi/(R1 + R2)',
+     'Vo' : 'A*R2*Vi/(R1 + R2)',
+     'iA' : 'A*R2*Vi/(R1*RL + R2*RL)',
+     'iVi': 'Vi/(R1 + R2)',
+     'v1' : 'Vi'}),
+  (cis,{
+     'Vc' : 'R2*Vi/(R1 + R2)',
+     'Vo' : 'G*R2*RL*Vi/(R1 + R2)',
+     'iVi': 'Vi/(R1 + R2)',
+     'v1' : 'Vi',
+     'v3' : '(-C*G*R2*RL*Vi*s - G*R2*Vi)/(C*R1*s + C*R2*s)',
+     'v4' : '-G*R2*Vi/(C*R1*s + C*R2*s)'}),
+  (floatingSource,{
+     'Iv' : 'R2*V1/(R1*R2 + R1*R3 + R2*R3)',
+     'Vd' : 'V1',
+     'iV1': '(R2*V1 + R3*V1)/(R1*R2 + R1*R3 + R2*R3)',
+     'v1' : '(R1*R2*V1 + R1*R3*V1)/(R1*R2 + R1*R3 + R2*R3)',
+     'v2' : '-R2*R3*V1/(R1*R2 + R1*R3 + R2*R3)'}),
+  (chainedMeasures,{
+     'Im' : '-Vi/(R1 + R2 + R3)',
+     'Vf' : 'R2*Vi/(R1 + R2 + R3)',
+     'Vo' : 'E*R2*Vi/(R1 + R2 + R3)',
+     'iE' : 'E*R2*Vi/(R1*R4 + R2*R4 + R3*R4)',
+     'iVi': 'Vi/(R1 + R2 + R3)',
+     'v1' : 'Vi',
+     'v3' : '(R2*Vi + R3*Vi)/(R1 + R2 + R3)',
+     'v4' : 'R3*Vi/(R1 + R2 + R3)'}),
+  (groundedMeasures,{
+     'Ig' : 'C1*G*I1*R1*R2*s/(C1*R2*s + 1)',
+     'V1' : '-I1*R1',
+     'V2' : '-G*I1*R1*R2/(C1*R2*s + 1)'})
+  ]
+
+def solveCircuit(build):
+    '''
+    Build and solve a circuit
+    Returns the circuit object
+    '''
+    c = circuit.circuit()
+    build(c)
+    c.solve()
+    return c
+
+# Names that sympify would not read as symbols
+_symbols = {'E':sympy.Symbol('E')}
+
+def sameExpr(a,b):
+    '''
+    Indicates if two expressions are equivalent
+    Strings are read as expressions
+    '''
+    a = sympy.sympify(a,locals=_symbols)
+    b = sympy.sympify(b,locals=_symbols)
+    return sympy.simplify(a-b) == 0
+
+class circuitTest(unittest.TestCase):
+
+    def checkSolution(self,solution,expected):
+        self.assertEqual(sorted(solution),sorted(expected))
+        for name in expected:
+            self.assertTrue(sameExpr(solution[name],expected[name]),
+                            '%s = %s' % (name,solution[name]))
+
+    def test_solutions(self):
+        # Solutions with the default solver
+        for build,expected in circuits:
+            c = solveCircuit(build)
+            self.checkSolution(c.solution,expected)
+
+    def test_sympySolver(self):
+        # Solutions with SymPy if SymEngine is available
+        if not circuit.symengineFound:
+            self.skipTest('SymEngine not available')
+        try:
+            circuit.symengineFound = False
+            for build,expected in circuits:
+                c = solveCircuit(build)
+                self.checkSolution(c.solution,expected)
+        finally:
+            circuit.symengineFound = True
+
+    def test_values(self):
+        # Substitution of the component values
+        c = solveCircuit(divider)
+        values = c.subs()
+        self.assertTrue(sameExpr(values['Vo'],'10/3'))
+        self.assertTrue(sameExpr(c.subs({'R2':1000})['Vo'],'5/2'))
+
+    def test_resolve(self):
+        # Adding a component after solving solves the circuit again
+        c = solveCircuit(divider)
+        c.addR('R3',2,0,2000)
+        c.solve()
+        self.assertTrue(sameExpr(c.solution['Vo'],'R2*R3*Vs/(R1*R2 + R1*R3 + R2*R3)'))
+
+    def test_evalParams(self):
+        # Numeric evaluation with swept parameters
+        c = solveCircuit(divider)
+        result = c.evalParams(R1=np.array([1000.0,2000.0,3000.0]))
+        self.assertTrue(np.allclose(result['Vo'],[10/3,2.5,2.0]))
+        self.assertEqual(np.shape(result['v1']),(3,))
+        self.assertRaises(circuit.circuitEx,c.evalParams,R9=3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+'''
+mmVarsTest.py
+Tests for the mmVars module
+
+Run from the repository folder with:
+   python -m unittest discover -s Tests -p "*Test.py"
+
+History:
+  15/10/2026 : First version
+'''
+
+# Python 2.7 compatibility
+from __future__ import print_function
+from __future__ import division
+
+import os
+import sys
+import unittest
+
+# Modules folder
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','Modules'))
+
+import mmVars
+
+class mmVarsTest(unittest.TestCase):
+
+    def test_equal(self):
+        # Equality with defined and undefined typical values
+        self.assertTrue(mmVars.mmVar(1,2) == mmVars.mmVar(1,2))
+        self.assertTrue(mmVars.mmVar(1,2,1.5) == mmVars.mmVar(1,2,1.5))
+        self.assertFalse(mmVars.mmVar(1,2) == mmVars.mmVar(1,2,1.5))
+        self.assertFalse(mmVars.mmVar(1,2,1.5) == mmVars.mmVar(1,2,1.2))
+        self.assertFalse(mmVars.mmVar(1,2) == mmVars.mmVar(1,3))
+
+    def test_montecarloEmpty(self):
+        # Montecarlo with no runs gives empty results
+        x = mmVars.mmVar(1,2)
+        self.assertEqual(mmVars.doMontecarlo(0,lambda a: 2*a,x),([],[]))
+        vRes,vData = mmVars.doMontecarloVec(0,lambda a: 2*a,x)
+        self.assertEqual((len(vRes),vData),(0,[]))
+        vRes,vData = mmVars.doMontecarloJit(0,lambda a: 2*a,x)
+        self.assertEqual((len(vRes),vData),(0,[]))
+
+if __name__ == '__main__':
+    unittest.main()